@@ -0,0 +1,118 @@
+"""Move snippet code to content-addressed code_blobs
+
+Revision ID: 5f0c2b7e9a41
+Revises: d235d2a66cef
+Create Date: 2026-10-19 10:12:31.402118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from core.compression import compress, content_hash, decompress_text
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f0c2b7e9a41'
+down_revision: Union[str, None] = 'd235d2a66cef'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Сколько сниппетов переносим за одну итерацию
+BATCH_SIZE = 1000
+
+code_blobs = sa.table(
+    'code_blobs',
+    sa.column('hash', sa.String),
+    sa.column('codec', sa.String),
+    sa.column('size', sa.Integer),
+    sa.column('data', sa.LargeBinary),
+)
+
+
+# Переносит следующую пачку после after_uuid: сжимает, дедуплицирует по хэшу и проставляет ссылку.
+# Пачки идут по первичному ключу, поэтому уже перенесённые строки повторно не просматриваются.
+# Возвращает uuid последнего перенесённого сниппета или None, если строк больше нет
+def _backfill_batch(bind, after_uuid):
+    rows = bind.execute(sa.text(
+        "SELECT uuid, code FROM snippets "
+        "WHERE code_hash IS NULL AND (CAST(:after_uuid AS UUID) IS NULL OR uuid > CAST(:after_uuid AS UUID)) "
+        "ORDER BY uuid LIMIT :limit"
+    ), {"after_uuid": after_uuid, "limit": BATCH_SIZE}).all()
+    if not rows:
+        return None
+    blobs, links = {}, []
+    for snippet_uuid, code in rows:
+        data = code.encode("utf-8")
+        code_hash = content_hash(data)
+        if code_hash not in blobs:
+            codec, packed = compress(data)
+            blobs[code_hash] = {"hash": code_hash, "codec": codec, "size": len(data), "data": packed}
+        links.append({"snippet_uuid": snippet_uuid, "code_hash": code_hash})
+    # Блобы пишутся раньше ссылок: после сбоя между ними пачка просто переносится повторно
+    bind.execute(
+        postgresql.insert(code_blobs).on_conflict_do_nothing(index_elements=['hash']),
+        list(blobs.values()),
+    )
+    bind.execute(sa.text(
+        "UPDATE snippets SET code_hash = :code_hash WHERE uuid = :snippet_uuid"
+    ), links)
+    return rows[-1][0]
+
+
+def _backfill(bind):
+    last_uuid = None
+    while True:
+        last_uuid = _backfill_batch(bind, last_uuid)
+        if last_uuid is None:
+            break
+
+
+def upgrade() -> None:
+    # Повторный запуск после прерванного переноса продолжает с уже созданными таблицей и колонкой
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('code_blobs'):
+        op.create_table('code_blobs',
+        sa.Column('hash', sa.String(length=64), nullable=False),
+        sa.Column('codec', sa.String(length=16), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.PrimaryKeyConstraint('hash')
+        )
+    if 'code_hash' not in {column['name'] for column in inspector.get_columns('snippets')}:
+        op.add_column('snippets', sa.Column('code_hash', sa.String(length=64), nullable=True))
+
+    # Каждая пачка коммитится отдельно: таблица не блокируется на всё время переноса
+    with op.get_context().autocommit_block():
+        _backfill(op.get_bind())
+
+    # Сниппеты, записанные старой версией приложения во время переноса, дописываем под блокировкой записи
+    op.execute("LOCK TABLE snippets IN SHARE ROW EXCLUSIVE MODE")
+    _backfill(op.get_bind())
+
+    op.alter_column('snippets', 'code_hash', existing_type=sa.String(length=64), nullable=False)
+    op.create_index(op.f('ix_snippets_code_hash'), 'snippets', ['code_hash'], unique=False)
+    op.create_foreign_key('snippets_code_hash_fkey', 'snippets', 'code_blobs', ['code_hash'], ['hash'])
+    op.drop_column('snippets', 'code')
+
+
+def downgrade() -> None:
+    op.add_column('snippets', sa.Column('code', sa.Text(), nullable=True))
+
+    bind = op.get_bind()
+    blob_hashes = bind.execute(sa.text("SELECT hash FROM code_blobs")).scalars().all()
+    for start in range(0, len(blob_hashes), BATCH_SIZE):
+        rows = bind.execute(sa.text(
+            "SELECT hash, codec, data FROM code_blobs WHERE hash = ANY(:hashes)"
+        ), {"hashes": blob_hashes[start:start + BATCH_SIZE]}).all()
+        bind.execute(sa.text(
+            "UPDATE snippets SET code = :code WHERE code_hash = :code_hash"
+        ), [{"code": decompress_text(data, codec), "code_hash": blob_hash} for blob_hash, codec, data in rows])
+
+    op.alter_column('snippets', 'code', existing_type=sa.Text(), nullable=False)
+    op.drop_constraint('snippets_code_hash_fkey', 'snippets', type_='foreignkey')
+    op.drop_index(op.f('ix_snippets_code_hash'), table_name='snippets')
+    op.drop_column('snippets', 'code_hash')
+    op.drop_table('code_blobs')
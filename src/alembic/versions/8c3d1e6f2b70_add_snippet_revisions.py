@@ -0,0 +1,37 @@
+"""Add snippet revisions
+
+Revision ID: 8c3d1e6f2b70
+Revises: 5f0c2b7e9a41
+Create Date: 2026-10-19 13:40:07.118524
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c3d1e6f2b70'
+down_revision: Union[str, None] = '5f0c2b7e9a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('snippet_revisions',
+    sa.Column('snippet_uuid', sa.UUID(), nullable=False),
+    sa.Column('number', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(), nullable=True),
+    sa.Column('is_public', sa.Boolean(), nullable=True),
+    sa.Column('is_keyframe', sa.Boolean(), nullable=False),
+    sa.Column('codec', sa.String(length=16), nullable=False),
+    sa.Column('payload', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['snippet_uuid'], ['snippets.uuid'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('snippet_uuid', 'number')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('snippet_revisions')
@@ -0,0 +1,86 @@
+"""Add snippet_uuids lookup table
+
+Revision ID: 9d4f6a2c8b15
+Revises: c5b9e2d47a13
+Create Date: 2026-10-19 21:03:12.508214
+
+snippet_uuids keeps snippet uuids globally unique and serves as the target
+of the snippet_revisions foreign key in both the plain and the partitioned
+layout: a partitioned snippets table cannot have a unique constraint on uuid
+alone. Rows are maintained by statement-level triggers on snippets, so bulk
+imports add one INSERT ... SELECT per statement; the foreign key is deferred
+to commit because those rows only appear at the end of each statement.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4f6a2c8b15'
+down_revision: Union[str, None] = 'c5b9e2d47a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _is_partitioned() -> bool:
+    return op.get_bind().execute(sa.text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'snippets'::regclass)"
+    )).scalar()
+
+
+def upgrade() -> None:
+    op.create_table('snippet_uuids',
+    sa.Column('uuid', sa.UUID(), nullable=False),
+    sa.PrimaryKeyConstraint('uuid')
+    )
+    # Запись в snippets блокируется до коммита, чтобы триггеры и начальное заполнение не разошлись
+    op.execute("LOCK TABLE snippets IN SHARE ROW EXCLUSIVE MODE")
+
+    # Дубликат uuid ломается на первичном ключе snippet_uuids и откатывает весь оператор над snippets.
+    # При UPDATE uuid обычно не меняется (в том числе при переносе строки между партициями) - тогда ничего не делаем
+    op.execute("""
+        CREATE FUNCTION snippet_uuids_apply() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO snippet_uuids (uuid) SELECT uuid FROM new_rows;
+            ELSIF TG_OP = 'DELETE' THEN
+                DELETE FROM snippet_uuids WHERE uuid IN (SELECT uuid FROM old_rows);
+            ELSE
+                DELETE FROM snippet_uuids WHERE uuid IN (SELECT uuid FROM old_rows EXCEPT SELECT uuid FROM new_rows);
+                INSERT INTO snippet_uuids (uuid) SELECT uuid FROM new_rows EXCEPT SELECT uuid FROM old_rows;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("CREATE TRIGGER snippet_uuids_insert AFTER INSERT ON snippets "
+               "REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION snippet_uuids_apply()")
+    op.execute("CREATE TRIGGER snippet_uuids_delete AFTER DELETE ON snippets "
+               "REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION snippet_uuids_apply()")
+    op.execute("CREATE TRIGGER snippet_uuids_update AFTER UPDATE ON snippets "
+               "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+               "FOR EACH STATEMENT EXECUTE FUNCTION snippet_uuids_apply()")
+
+    op.execute("INSERT INTO snippet_uuids (uuid) SELECT uuid FROM snippets")
+
+    # Удаление сниппета каскадом удаляет его ревизии через snippet_uuids при любой схеме хранения.
+    # Строка snippet_uuids появляется только в конце оператора над snippets, поэтому проверка отложена до коммита
+    if not _is_partitioned():
+        op.drop_constraint('snippet_revisions_snippet_uuid_fkey', 'snippet_revisions', type_='foreignkey')
+    op.execute("DELETE FROM snippet_revisions r WHERE NOT EXISTS (SELECT 1 FROM snippet_uuids u WHERE u.uuid = r.snippet_uuid)")
+    op.create_foreign_key('snippet_revisions_snippet_uuid_fkey', 'snippet_revisions', 'snippet_uuids',
+                          ['snippet_uuid'], ['uuid'], ondelete='CASCADE', deferrable=True, initially='DEFERRED')
+
+
+def downgrade() -> None:
+    op.drop_constraint('snippet_revisions_snippet_uuid_fkey', 'snippet_revisions', type_='foreignkey')
+    if not _is_partitioned():
+        op.create_foreign_key('snippet_revisions_snippet_uuid_fkey', 'snippet_revisions', 'snippets',
+                              ['snippet_uuid'], ['uuid'], ondelete='CASCADE')
+    op.execute("DROP TRIGGER snippet_uuids_update ON snippets")
+    op.execute("DROP TRIGGER snippet_uuids_delete ON snippets")
+    op.execute("DROP TRIGGER snippet_uuids_insert ON snippets")
+    op.execute("DROP FUNCTION snippet_uuids_apply()")
+    op.drop_table('snippet_uuids')
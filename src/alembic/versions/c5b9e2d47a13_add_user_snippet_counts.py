@@ -0,0 +1,89 @@
+"""Add user snippet counts
+
+Revision ID: c5b9e2d47a13
+Revises: 8c3d1e6f2b70
+Create Date: 2026-10-19 19:12:31.402817
+
+Counters are maintained by statement-level triggers on snippets: each
+statement applies one aggregated delta per author, so bulk imports do not
+hit the counter row once per inserted snippet.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5b9e2d47a13'
+down_revision: Union[str, None] = '8c3d1e6f2b70'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Прибавляет к счётчикам дельты из source (author_id, sign, is_public); правки без смены автора и видимости
+# счётчики не трогают, а порядок по user_id защищает от взаимоблокировок
+APPLY_DELTA = """
+        INSERT INTO user_snippet_counts (user_id, total, public)
+        SELECT author_id, sum(sign), COALESCE(sum(sign) FILTER (WHERE is_public), 0)
+        FROM ({source}) AS changes
+        WHERE author_id IS NOT NULL
+        GROUP BY author_id
+        HAVING sum(sign) <> 0 OR sum(sign) FILTER (WHERE is_public) <> 0
+        ORDER BY author_id
+        ON CONFLICT (user_id) DO UPDATE
+        SET total = user_snippet_counts.total + EXCLUDED.total,
+            public = user_snippet_counts.public + EXCLUDED.public;
+"""
+NEW_ROWS = "SELECT author_id, 1 AS sign, is_public IS TRUE AS is_public FROM new_rows"
+OLD_ROWS = "SELECT author_id, -1 AS sign, is_public IS TRUE AS is_public FROM old_rows"
+
+
+def upgrade() -> None:
+    op.create_table('user_snippet_counts',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('public', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    # Запись в snippets блокируется до коммита, чтобы триггеры и начальный подсчёт не разошлись
+    op.execute("LOCK TABLE snippets IN SHARE ROW EXCLUSIVE MODE")
+
+    op.execute(f"""
+        CREATE FUNCTION user_snippet_counts_apply() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                {APPLY_DELTA.format(source=NEW_ROWS)}
+            ELSIF TG_OP = 'DELETE' THEN
+                {APPLY_DELTA.format(source=OLD_ROWS)}
+            ELSE
+                {APPLY_DELTA.format(source=f"{NEW_ROWS} UNION ALL {OLD_ROWS}")}
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    # Триггер с таблицами переходов может слушать только одно событие
+    op.execute("CREATE TRIGGER user_snippet_counts_insert AFTER INSERT ON snippets "
+               "REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION user_snippet_counts_apply()")
+    op.execute("CREATE TRIGGER user_snippet_counts_delete AFTER DELETE ON snippets "
+               "REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION user_snippet_counts_apply()")
+    op.execute("CREATE TRIGGER user_snippet_counts_update AFTER UPDATE ON snippets "
+               "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+               "FOR EACH STATEMENT EXECUTE FUNCTION user_snippet_counts_apply()")
+
+    op.execute("""
+        INSERT INTO user_snippet_counts (user_id, total, public)
+        SELECT author_id, count(*), count(*) FILTER (WHERE is_public)
+        FROM snippets
+        WHERE author_id IS NOT NULL
+        GROUP BY author_id
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER user_snippet_counts_update ON snippets")
+    op.execute("DROP TRIGGER user_snippet_counts_delete ON snippets")
+    op.execute("DROP TRIGGER user_snippet_counts_insert ON snippets")
+    op.execute("DROP FUNCTION user_snippet_counts_apply()")
+    op.drop_table('user_snippet_counts')
@@ -0,0 +1,27 @@
+from fastapi import APIRouter
+from starlette.responses import JSONResponse
+
+from core.admission import admission
+from db.db import engine
+
+health_router = APIRouter(prefix="/health", tags=['health'])
+
+
+# Процесс жив и обслуживает event loop
+@health_router.get("/live", name="Liveness")
+async def liveness():
+    return {"status": "alive"}
+
+
+# Готовность принимать трафик: балансировщик снимает воркер при перегрузке
+@health_router.get("/ready", name="Readiness")
+async def readiness():
+    pool = engine.pool
+    state = admission.status()
+    state["pool"] = {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+    state["status"] = "overloaded" if state["overloaded"] else "ready"
+    return JSONResponse(status_code=503 if state["overloaded"] else 200, content=state)
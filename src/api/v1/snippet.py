@@ -1,7 +1,9 @@
-from typing import List
+import uuid
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import or_
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import false, or_, true
 
 from sqlalchemy.orm import joinedload
 
@@ -9,10 +11,20 @@ from auth.auth import get_current_user
 import logging
 
 from core.config import settings
+from core.deadlines import is_pool_timeout, is_statement_timeout
 from db.db import db_dependency
+from db.queries import snippet_by_uuid_stmt
 from models import User
 from models.snippet import Snippet
-from schemas.snippet import SnippetCreate, SnippetResponse, SnippetDisplay
+from schemas.snippet import (SnippetCreate, SnippetResponse, SnippetHighlightResponse, SnippetDisplay,
+                             SnippetImportReport, SnippetRevisionInfo, SnippetRevisionResponse,
+                             SnippetCodeUploadResponse)
+from services.highlight import highlight_available, highlight_snippet, is_known_style
+from services.export import EXPORTERS, EXPORT_MEDIA_TYPES, decode_cursor
+from services.importer import import_format_for_content_type, import_snippets
+from services.revisions import (add_initial_revision, add_revision, add_stored_revision, get_revision,
+                                list_revisions)
+from services.storage import receive_code_stream, store_blob, store_code
 from sqlalchemy.future import select
 
 snippet_router = APIRouter(prefix="/snippets", tags=['snippets'])
@@ -25,9 +37,17 @@ async def create_snippet(snippet: SnippetCreate, db: db_dependency, current_user
     logger.debug("Функция create_snippet вызвана")
     logger.info(f"Создание сниппета для пользователя: {current_user.id} с заголовком: {snippet.title}")
 
+    # Счётчик загружен вместе с пользователем, отдельный запрос не нужен
+    if settings.snippet_quota and current_user.snippet_count >= settings.snippet_quota:
+        logger.warning(f"Пользователь {current_user.id} исчерпал квоту сниппетов")
+        raise HTTPException(status_code=403, detail=f"Snippet quota exceeded ({settings.snippet_quota})")
+
     try:
-        db_snippet = Snippet(**snippet.dict(), author_id=current_user.id)
+        code_hash = await store_code(db, snippet.code)
+        db_snippet = Snippet(**snippet.dict(exclude={'code'}), code_hash=code_hash, author_id=current_user.id)
         db.add(db_snippet)
+        await db.flush()
+        add_initial_revision(db, db_snippet, snippet.code)
         await db.commit()
         await db.refresh(db_snippet)
 
@@ -35,38 +55,53 @@ async def create_snippet(snippet: SnippetCreate, db: db_dependency, current_user
         return {
             "uuid": str(db_snippet.uuid),
             "title": db_snippet.title,
-            "code": db_snippet.code,
-            "author_name": db_snippet.author.name,
+            "code": snippet.code,
+            "author_name": current_user.name,
             "is_public": db_snippet.is_public,
             "share_link": f"http://{settings.app_host}:{settings.app_port}/snippets/get_snippet/{db_snippet.uuid}"
         }
     except Exception as e:
+        if is_statement_timeout(e) or is_pool_timeout(e):
+            raise
         logger.error(f"Ошибка при создании сниппета: {e}")
         raise HTTPException(status_code=500, detail="Ошибка при создании сниппета")
 
 
 # Получение код-сниппета по UUID
-@snippet_router.get("/get_snippet/{snippet_uuid}", response_model=SnippetResponse, name="Получить сниппет по UUID")
-async def get_snippet_by_uuid(snippet_uuid: str, db: db_dependency):
+@snippet_router.get("/get_snippet/{snippet_uuid}", response_model=SnippetHighlightResponse, response_model_exclude_none=True,
+                    name="Получить сниппет по UUID")
+async def get_snippet_by_uuid(
+    snippet_uuid: str,
+    db: db_dependency,
+    response_format: Literal["json", "html"] = Query("json", alias="format"),
+    style: str = "default",
+):
     logger.debug("Функция get_snippet_by_uuid вызвана")
     logger.info(f"Запрос сниппета по UUID: {snippet_uuid}")
 
-    db_snippet = await db.execute(
-        select(Snippet).options(joinedload(Snippet.author)).where(Snippet.uuid == snippet_uuid)
-    )
+    if response_format == "html":
+        if not highlight_available():
+            raise HTTPException(status_code=501, detail="Syntax highlighting is not available")
+        if not is_known_style(style):
+            raise HTTPException(status_code=400, detail=f"Unknown highlight style: {style}")
+
+    db_snippet = await db.execute(snippet_by_uuid_stmt(snippet_uuid))
     db_snippet = db_snippet.scalars().first()
 
     if db_snippet is None:
         logger.warning(f"Сниппет с UUID: {snippet_uuid} не найден")
         raise HTTPException(status_code=404, detail="Snippet not found")
 
-    return {
+    response = {
         "uuid": str(db_snippet.uuid),
         "title": db_snippet.title,
         "code": db_snippet.code,
         "author_name": db_snippet.author.name,
         "is_public": db_snippet.is_public,
     }
+    if response_format == "html":
+        response.update(await highlight_snippet(db_snippet.code_hash, response["code"], db_snippet.title, style))
+    return response
 
 
 # Получение всех публичных код-сниппетов
@@ -80,14 +115,16 @@ async def get_all_snippets(
 
     try:
         # Получаем публичные сниппеты
-        public_query = select(Snippet).options(joinedload(Snippet.author)).filter(Snippet.is_public.is_(True))
+        public_query = select(Snippet).options(
+            joinedload(Snippet.author), joinedload(Snippet.code_blob)
+        ).filter(Snippet.is_public == true())
         public_result = await db.execute(public_query)
         public_snippets = public_result.scalars().all()
 
         # Получаем личные сниппеты текущего пользователя, которые не публичные
-        personal_query = select(Snippet).options(joinedload(Snippet.author)).filter(
+        personal_query = select(Snippet).options(joinedload(Snippet.author), joinedload(Snippet.code_blob)).filter(
             Snippet.author_id == current_user.id,
-            Snippet.is_public.is_(False)
+            Snippet.is_public == false()
         )
         personal_result = await db.execute(personal_query)
         personal_snippets = personal_result.scalars().all()
@@ -96,6 +133,8 @@ async def get_all_snippets(
         snippets_set = {snippet.uuid: snippet for snippet in public_snippets + personal_snippets}
 
     except Exception as e:
+        if is_statement_timeout(e) or is_pool_timeout(e):
+            raise
         logger.error(f"Ошибка при получении всех сниппетов: {e}")
         raise HTTPException(status_code=500, detail="Ошибка при получении всех сниппетов")
 
@@ -111,21 +150,87 @@ async def get_all_snippets(
     ]
 
 
+# Потоковая выгрузка сниппетов пользователя или всех публичных
+@snippet_router.get("/export", name="Выгрузить сниппеты")
+async def export_snippets(
+    current_user: User = Depends(get_current_user),
+    export_format: Literal["ndjson", "tar", "zip"] = Query("ndjson", alias="format"),
+    scope: Literal["mine", "public"] = "mine",
+    cursor: Optional[str] = None,
+):
+    logger.debug("Функция export_snippets вызвана")
+    logger.info(f"Выгрузка сниппетов ({scope}, {export_format}) пользователем: {current_user.id}")
+
+    # Токен продолжения есть только в строках NDJSON: оборванный архив не даёт его узнать
+    if cursor and export_format != "ndjson":
+        raise HTTPException(status_code=400, detail="Export cursor is only supported for ndjson")
+    try:
+        after_uuid = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid export cursor")
+
+    author_id = current_user.id if scope == "mine" else None
+    headers = {}
+    if export_format != "ndjson":
+        headers["Content-Disposition"] = f'attachment; filename="snippets.{export_format}"'
+
+    return StreamingResponse(
+        EXPORTERS[export_format](author_id, after_uuid),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers=headers,
+    )
+
+
+# Массовый импорт сниппетов из NDJSON/CSV, переданного сырым телом запроса.
+# Тело разбирается по мере поступления, а multipart Starlette сначала сохранил бы его во временный файл целиком
+@snippet_router.post("/import", response_model=SnippetImportReport, name="Импортировать сниппеты")
+async def import_snippets_file(
+    request: Request,
+    db: db_dependency,
+    current_user: User = Depends(get_current_user),
+    import_format: Optional[Literal["ndjson", "csv"]] = Query(None, alias="format"),
+):
+    logger.debug("Функция import_snippets_file вызвана")
+    logger.info(f"Импорт сниппетов пользователем: {current_user.id}")
+
+    if settings.snippet_quota and current_user.snippet_count >= settings.snippet_quota:
+        logger.warning(f"Пользователь {current_user.id} исчерпал квоту сниппетов")
+        raise HTTPException(status_code=403, detail=f"Snippet quota exceeded ({settings.snippet_quota})")
+
+    # Строки сверх остатка квоты не загружаются и попадают в отчёт как ошибки
+    report = await import_snippets(
+        db, request.stream(), author_id=current_user.id,
+        import_format=import_format or import_format_for_content_type(request.headers.get("content-type")),
+        quota=settings.snippet_quota,
+    )
+    logger.info(f"Импорт завершён: загружено {report.imported}, ошибок {report.failed}")
+    return report
+
+
 # Обновление код-сниппета
 @snippet_router.put("/update_snippet/{snippet_uuid}", response_model=SnippetResponse, name="Обновить сниппет")
 async def update_snippet(snippet_uuid: str, snippet: SnippetCreate, db: db_dependency, current_user: User = Depends(get_current_user)):
     logger.debug("Функция update_snippet вызвана")
     logger.info(f"Обновление сниппета с UUID: {snippet_uuid} для пользователя: {current_user.id}")
 
-    db_snippet = await db.execute(select(Snippet).where(Snippet.uuid == snippet_uuid))
+    # Строка сниппета блокируется до коммита: параллельные обновления получают номера ревизий по очереди
+    db_snippet = await db.execute(
+        select(Snippet)
+        .options(joinedload(Snippet.code_blob))
+        .where(Snippet.uuid == snippet_uuid, Snippet.author_id == current_user.id)
+        .with_for_update(of=Snippet)
+    )
     db_snippet = db_snippet.scalars().first()
 
     if db_snippet is None or db_snippet.author_id != current_user.id:
         logger.warning(f"Сниппет с UUID: {snippet_uuid} не найден или доступ запрещен")
         raise HTTPException(status_code=404, detail="Snippet not found or not authorized(Сниппет не найден или не принадлежит вам)")
 
-    for key, value in snippet.dict().items():
+    previous_code, previous_title, previous_is_public = db_snippet.code, db_snippet.title, db_snippet.is_public
+    for key, value in snippet.dict(exclude={'code'}).items():
         setattr(db_snippet, key, value)
+    db_snippet.code_hash = await store_code(db, snippet.code)
+    await add_revision(db, db_snippet, snippet.code, previous_code, previous_title, previous_is_public)
 
     await db.commit()
     await db.refresh(db_snippet)
@@ -134,19 +239,114 @@ async def update_snippet(snippet_uuid: str, snippet: SnippetCreate, db: db_depen
     return {
         "uuid": str(db_snippet.uuid),
         "title": db_snippet.title,
-        "code": db_snippet.code,
-        "author_name": db_snippet.author.name,
+        "code": snippet.code,
+        "author_name": current_user.name,
+        "is_public": db_snippet.is_public,
+    }
+
+
+# Загрузка кода сниппета сырым телом запроса (text/plain) без разбора JSON
+@snippet_router.put("/upload_code/{snippet_uuid}", response_model=SnippetCodeUploadResponse,
+                    name="Загрузить код сниппета")
+async def upload_snippet_code(snippet_uuid: uuid.UUID, request: Request, db: db_dependency,
+                              current_user: User = Depends(get_current_user)):
+    logger.debug("Функция upload_snippet_code вызвана")
+    logger.info(f"Загрузка кода сниппета с UUID: {snippet_uuid} для пользователя: {current_user.id}")
+
+    db_snippet = await db.execute(
+        select(Snippet)
+        .where(Snippet.uuid == snippet_uuid, Snippet.author_id == current_user.id)
+    )
+    db_snippet = db_snippet.scalars().first()
+
+    if db_snippet is None or db_snippet.author_id != current_user.id:
+        logger.warning(f"Сниппет с UUID: {snippet_uuid} не найден или доступ запрещен")
+        raise HTTPException(status_code=404, detail="Snippet not found or not authorized(Сниппет не найден или не принадлежит вам)")
+
+    # Пока клиент передаёт тело, соединение из пула не держим
+    await db.close()
+
+    try:
+        code_hash, codec, size, payload = await receive_code_stream(request.stream())
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Snippet code must be UTF-8 text")
+
+    # Сниппет перечитывается под блокировкой: за время загрузки его могли изменить или удалить
+    db_snippet = await db.execute(
+        select(Snippet)
+        .options(joinedload(Snippet.code_blob))
+        .where(Snippet.uuid == snippet_uuid, Snippet.author_id == current_user.id)
+        .with_for_update(of=Snippet)
+    )
+    db_snippet = db_snippet.scalars().first()
+    if db_snippet is None:
+        logger.warning(f"Сниппет с UUID: {snippet_uuid} удалён во время загрузки кода")
+        raise HTTPException(status_code=404, detail="Snippet not found or not authorized(Сниппет не найден или не принадлежит вам)")
+
+    previous_blob = db_snippet.code_blob
+    await store_blob(db, code_hash, codec, size, payload)
+    db_snippet.code_hash = code_hash
+    await add_stored_revision(db, db_snippet, codec, payload, previous_blob, db_snippet.title, db_snippet.is_public)
+    await db.commit()
+
+    logger.info(f"Код сниппета с UUID: {snippet_uuid} загружен ({size} байт)")
+    return {
+        "uuid": str(db_snippet.uuid),
+        "title": db_snippet.title,
+        "code_hash": code_hash,
+        "size": size,
         "is_public": db_snippet.is_public,
     }
 
 
+# Проверка, что текущий пользователь может читать историю сниппета
+async def get_readable_snippet(snippet_uuid: uuid.UUID, db: db_dependency, current_user: User) -> Snippet:
+    db_snippet = await db.get(Snippet, snippet_uuid)
+    if db_snippet is None or (not db_snippet.is_public and db_snippet.author_id != current_user.id):
+        logger.warning(f"Сниппет с UUID: {snippet_uuid} не найден или доступ запрещен")
+        raise HTTPException(status_code=404, detail="Snippet not found")
+    return db_snippet
+
+
+# История ревизий код-сниппета
+@snippet_router.get("/{snippet_uuid}/revisions", response_model=List[SnippetRevisionInfo], name="Список ревизий")
+async def get_snippet_revisions(snippet_uuid: uuid.UUID, db: db_dependency,
+                                current_user: User = Depends(get_current_user)):
+    logger.debug("Функция get_snippet_revisions вызвана")
+    await get_readable_snippet(snippet_uuid, db, current_user)
+    return [revision._asdict() for revision in await list_revisions(db, snippet_uuid)]
+
+
+# Содержимое конкретной ревизии код-сниппета
+@snippet_router.get("/{snippet_uuid}/revisions/{number}", response_model=SnippetRevisionResponse,
+                    name="Получить ревизию")
+async def get_snippet_revision(snippet_uuid: uuid.UUID, number: int, db: db_dependency,
+                               current_user: User = Depends(get_current_user)):
+    logger.debug("Функция get_snippet_revision вызвана")
+    await get_readable_snippet(snippet_uuid, db, current_user)
+
+    found = await get_revision(db, snippet_uuid, number)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Revision not found")
+    revision, code = found
+    return {
+        "number": revision.number,
+        "title": revision.title,
+        "code": code,
+        "is_public": revision.is_public,
+        "created_at": revision.created_at,
+    }
+
+
 # Удаление код-сниппета
 @snippet_router.delete("/delete_snippet/{snippet_uuid}", response_model=dict, name="Удалить сниппет")
 async def delete_snippet(snippet_uuid: str, db: db_dependency, current_user: User = Depends(get_current_user)):
     logger.debug("Функция delete_snippet вызвана")
     logger.info(f"Удаление сниппета с UUID: {snippet_uuid} для пользователя: {current_user.id}")
 
-    db_snippet = await db.execute(select(Snippet).where(Snippet.uuid == snippet_uuid))
+    db_snippet = await db.execute(
+        select(Snippet).where(Snippet.uuid == snippet_uuid, Snippet.author_id == current_user.id)
+    )
     db_snippet = db_snippet.scalars().first()
 
     if db_snippet is None or db_snippet.author_id != current_user.id:
@@ -1,12 +1,13 @@
-import httpx
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy import select
 from starlette import status
 from sqlalchemy.ext.asyncio import AsyncSession
-from auth.auth import authenticate_user, create_access_token, reg_user
+from auth.auth import authenticate_user, create_access_token, reg_user, user_dependency
+from core.config import settings
+from core.deadlines import is_pool_timeout, is_statement_timeout
 from db.db import db_dependency
 from models import User
-from schemas.user import UserRegisterSchema, UserLoginSchema, UserResponse
+from schemas.user import UserRegisterSchema, UserLoginSchema, UserResponse, UserProfileResponse
 
 user_router = APIRouter(prefix="/user", tags=['user'])
 
@@ -33,11 +34,29 @@ user_router = APIRouter(prefix="/user", tags=['user'])
 async def register_user(user_data: UserRegisterSchema, db: db_dependency):
     try:
         return await reg_user(user_data=user_data, db=db)
+    except HTTPException:
+        raise
     except Exception as ex:
+        # Дедлайн и исчерпание пула отдаются обработчикам исключений как 504/503
+        if is_statement_timeout(ex) or is_pool_timeout(ex):
+            raise
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                             detail=f"Аn error has occurred: {ex}")
 
 
+# Профиль текущего пользователя со счётчиками сниппетов из get_current_user
+@user_router.get("/me", response_model=UserProfileResponse, name="Текущий пользователь")
+async def get_me(current_user: user_dependency):
+    return UserProfileResponse(
+        id=current_user.id,
+        email=current_user.email,
+        name=current_user.name,
+        snippet_count=current_user.snippet_count,
+        public_snippet_count=current_user.public_snippet_count,
+        snippet_quota=settings.snippet_quota,
+    )
+
+
 # @user_router.post("/login", name="Вход")
 # async def login_for_access_token(db: db_dependency, login_data: UserLoginSchema):
 #     user = await authenticate_user(login_data, db)
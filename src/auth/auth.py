@@ -1,18 +1,17 @@
+import asyncio
 from calendar import timegm
 from datetime import timedelta, datetime
+from functools import lru_cache
 from typing import Optional, Annotated
 
-import bcrypt
-from asyncpg import UniqueViolationError
 from fastapi import Depends, HTTPException, APIRouter
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
-from passlib.context import CryptContext
-from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
 from starlette import status
 
 from core.config import settings
 from db.db import db_dependency
+from db.queries import user_by_email_stmt, user_exists_stmt
 from models import User
 from schemas.user import UserRegisterSchema, UserLoginSchema
 
@@ -24,22 +23,30 @@ oauth2_bearer = OAuth2PasswordBearer(tokenUrl='/auth/token')
 JWT_SECRET = settings.jwt_secret  # your_super_secret
 # Алгоритм хеширования
 ALGORITHM = settings.algorithm  # 'HS256'
-# Контекст для валидации и хеширования
-bcrypt_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
+
+
+# Контекст для валидации и хеширования; passlib и bcrypt импортируются при первом использовании
+@lru_cache(maxsize=None)
+def get_bcrypt_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=['bcrypt'], deprecated='auto')
 
 
 # Генерация соли
 def generate_salt():
+    import bcrypt
     return bcrypt.gensalt().decode("utf-8")
 
 
 # Хэширование пароля с использованием соли
 def hash_password(password: str, salt: str):
-    return bcrypt_context.hash(password + salt)
+    return get_bcrypt_context().hash(password + salt)
 
 
 # Создание нового токена
 def create_access_token(data: dict, expires_delta: timedelta = timedelta(minutes=15)) -> str:
+    from jose import jwt
+
     # копируем исходные данные, чтобы случайно их не испортить
     to_encode = data.copy()
 
@@ -53,42 +60,64 @@ def create_access_token(data: dict, expires_delta: timedelta = timedelta(minutes
     return jwt.encode(to_encode, JWT_SECRET, algorithm=ALGORITHM)
 
 
+# Прогрев: импорт passlib/jose и первый encode/decode JWT до приёма трафика
+def warmup_auth():
+    from jose import jwt
+
+    get_bcrypt_context()
+    token = create_access_token({"sub": "warmup"})
+    jwt.decode(token, JWT_SECRET, algorithms=[ALGORITHM])
+
+
 # Регистрация пользователя
 async def reg_user(user_data: UserRegisterSchema, db: db_dependency):
+    duplicate_exception = HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                        detail='User with such credentials already exists')
+
+    # Сначала дешёвая проверка по уникальным индексам: на дубликатах bcrypt не вызывается
+    if await db.scalar(user_exists_stmt(user_data.email, user_data.name)):
+        raise duplicate_exception
+    # Завершаем транзакцию, чтобы соединение вернулось в пул на время хэширования
+    await db.rollback()
+
     user_salt: str = generate_salt()
-    try:
-        create_user_statement: User = User(
+    # bcrypt нагружает CPU - считаем его в потоке, не блокируя цикл событий
+    hashed_password = await asyncio.to_thread(hash_password, user_data.password, user_salt)
+
+    # Гонку двух одновременных регистраций решает сама вставка: при конфликте строка не вернётся
+    result = await db.execute(
+        insert(User)
+        .values(
             **user_data.model_dump(exclude={'password'}),  # распаковываем объект пользователя, исключая пароль
             salt=user_salt,
-            hashed_password=hash_password(user_data.password, user_salt)
+            hashed_password=hashed_password,
         )
-        # создаём пользователя в базе данных
-        db.add(create_user_statement)
-        await db.commit()
-        return {"response": "User created successfully"}
-    except UniqueViolationError:
-        # если возникает ошибка UniqueViolationError, то считаем, что пользователь с такими данными уже есть
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
-                            detail='User with such credentials already exists')
-    except Exception as ex:
-        raise ex
+        .on_conflict_do_nothing()
+        .returning(User.id)
+    )
+    if result.scalar_one_or_none() is None:
+        await db.rollback()
+        raise duplicate_exception
+    await db.commit()
+    return {"response": "User created successfully"}
 
 
 # Аутентификация пользователя
 async def authenticate_user(login_data: UserLoginSchema, db: db_dependency):
     # делаем SELECT-запрос в базу данных для нахождения пользователя по email
-    result = await db.execute(select(User)
-                              .where(User.email == login_data.email))
+    result = await db.execute(user_by_email_stmt(login_data.email))
     user: Optional[User] = result.scalars().first()
     # пользователь будет авторизован, если он зарегистрирован и ввёл корректный пароль
     if not user:
         return False
-    if not bcrypt_context.verify(login_data.password + user.salt, user.hashed_password):
+    if not get_bcrypt_context().verify(login_data.password + user.salt, user.hashed_password):
         return False
     return user
 
 
 async def get_current_user(db: db_dependency, token: str = Depends(oauth2_bearer)):
+    from jose import jwt, JWTError
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -105,7 +134,7 @@ async def get_current_user(db: db_dependency, token: str = Depends(oauth2_bearer
         raise credentials_exception
 
     # Ищем пользователя в базе данных по email
-    result = await db.execute(select(User).where(User.email == user_email))
+    result = await db.execute(user_by_email_stmt(user_email))
     user: Optional[User] = result.scalars().first()
 
     if user is None:
@@ -0,0 +1,63 @@
+"""Bulk snippet fetch: ad-hoc httpx calls vs the shared SnippetsClient.
+
+Against a running server, fetches the same set of public snippets three ways:
+- ad-hoc:     a new httpx.AsyncClient per call, as internal services do today
+              (new TCP connection and handshake for every request);
+- sequential: one SnippetsClient, requests one after another over keep-alive;
+- bounded:    SnippetsClient.get_snippets with --concurrency requests in
+              flight, multiplexed over HTTP/2 when h2 is installed.
+
+Snippets are created first through the client (one token fetch for all of
+them). Run from src/:
+python -m benchmarks.bench_client --base-url http://localhost:9000 --email a@b.c --password secret [--count 200]
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from snippets_client import SnippetsClient
+
+
+async def adhoc(base_url: str, uuids: list[str]):
+    for snippet_uuid in uuids:
+        async with httpx.AsyncClient(base_url=base_url) as http:
+            (await http.get(f"/snippets/get_snippet/{snippet_uuid}")).raise_for_status()
+
+
+async def sequential(client: SnippetsClient, uuids: list[str]):
+    for snippet_uuid in uuids:
+        await client.get_snippet(snippet_uuid)
+
+
+async def timed(name: str, coro, count: int):
+    started = time.perf_counter()
+    await coro
+    elapsed = time.perf_counter() - started
+    print(f"{name:<12} {elapsed:8.3f}s {count / elapsed:10.1f} req/s")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:9000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    async with SnippetsClient(args.base_url, args.email, args.password, concurrency=args.concurrency) as client:
+        created = [await client.create_snippet(f"bench {i}", f"print({i})\n") for i in range(args.count)]
+        uuids = [snippet["uuid"] for snippet in created]
+        try:
+            await timed("ad-hoc", adhoc(args.base_url, uuids), args.count)
+            await timed("sequential", sequential(client, uuids), args.count)
+            await timed("bounded", client.get_snippets(uuids), args.count)
+        finally:
+            for snippet_uuid in uuids:
+                await client.delete_snippet(snippet_uuid)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
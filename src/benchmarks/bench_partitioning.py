@@ -0,0 +1,125 @@
+"""Plain vs partitioned snippets layout on a synthetic dataset.
+
+Builds two throwaway schemas in the configured database (bench_plain and
+bench_partitioned) with the same generated rows, then runs the router's
+queries in their partition-prunable form under EXPLAIN ANALYZE and reports
+execution time and how many partitions the plan touched.
+
+Run from src/: python -m benchmarks.bench_partitioning [--rows 2000000] [--users 20000] [--partitions 16]
+Add --keep to leave the schemas in place for manual inspection.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import asyncpg
+
+from core.config import settings
+
+QUERIES = {
+    "public listing": "SELECT uuid, title FROM {schema}.snippets WHERE is_public = true LIMIT 1000",
+    "personal (private)": "SELECT uuid, title FROM {schema}.snippets WHERE author_id = $1 AND is_public = false",
+    "owner by uuid": "SELECT uuid, title FROM {schema}.snippets WHERE uuid = $2 AND author_id = $1",
+    "by uuid only": "SELECT uuid, title FROM {schema}.snippets WHERE uuid = $2",
+}
+
+
+async def create_schemas(connection, rows: int, users: int, partitions: int):
+    for schema in ("bench_plain", "bench_partitioned"):
+        await connection.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE; CREATE SCHEMA {schema}")
+
+    await connection.execute("""
+        CREATE TABLE bench_plain.snippets (
+            uuid UUID PRIMARY KEY, title VARCHAR, code_hash VARCHAR(64) NOT NULL,
+            author_id INTEGER NOT NULL, is_public BOOLEAN NOT NULL DEFAULT true
+        );
+        CREATE INDEX ON bench_plain.snippets (author_id);
+    """)
+    await connection.execute("""
+        CREATE TABLE bench_partitioned.snippets (
+            uuid UUID NOT NULL, title VARCHAR, code_hash VARCHAR(64) NOT NULL,
+            author_id INTEGER NOT NULL, is_public BOOLEAN NOT NULL DEFAULT true,
+            PRIMARY KEY (uuid, is_public, author_id)
+        ) PARTITION BY LIST (is_public);
+        CREATE TABLE bench_partitioned.snippets_public PARTITION OF bench_partitioned.snippets
+            FOR VALUES IN (true) PARTITION BY HASH (author_id);
+        CREATE TABLE bench_partitioned.snippets_private PARTITION OF bench_partitioned.snippets
+            FOR VALUES IN (false) PARTITION BY HASH (author_id);
+    """)
+    # Те же партиции, что создаёт manage.py partition-snippets --split-public
+    for side in ("public", "private"):
+        for remainder in range(partitions):
+            await connection.execute(
+                f"CREATE TABLE bench_partitioned.snippets_{side}_p{remainder} "
+                f"PARTITION OF bench_partitioned.snippets_{side} "
+                f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+            )
+    # Индексы, которые запросы используют в проде: ix_snippets_uuid и ix_snippets_author_id
+    await connection.execute("CREATE INDEX ON bench_partitioned.snippets (uuid)")
+    await connection.execute("CREATE INDEX ON bench_partitioned.snippets (author_id)")
+
+    started = time.perf_counter()
+    await connection.execute(f"""
+        INSERT INTO bench_plain.snippets (uuid, title, code_hash, author_id, is_public)
+        SELECT gen_random_uuid(), 'snippet ' || i, md5(i::text) || md5(i::text),
+               1 + (i % {users}), random() < 0.3
+        FROM generate_series(1, {rows}) AS i
+    """)
+    await connection.execute("INSERT INTO bench_partitioned.snippets SELECT * FROM bench_plain.snippets")
+    await connection.execute("ANALYZE bench_plain.snippets; ANALYZE bench_partitioned.snippets")
+    print(f"generated {rows} rows for {users} users in {time.perf_counter() - started:.1f}s")
+
+
+def count_scans(plan: dict) -> int:
+    scanned = 1 if plan.get("Node Type", "").endswith("Scan") and "Relation Name" in plan else 0
+    return scanned + sum(count_scans(child) for child in plan.get("Plans", []))
+
+
+async def run_query(connection, sql: str, args: list, repeat: int) -> tuple[float, int]:
+    timings, scans = [], 0
+    for _ in range(repeat):
+        explain = await connection.fetchval(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}", *args)
+        result = json.loads(explain)[0]
+        timings.append(result["Execution Time"])
+        scans = count_scans(result["Plan"])
+    return statistics.median(timings), scans
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--partitions", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+
+    dsn = settings.postgres_dsn.unicode_string().replace("postgresql+asyncpg://", "postgresql://")
+    connection = await asyncpg.connect(dsn)
+    try:
+        await create_schemas(connection, args.rows, args.users, args.partitions)
+        sample = await connection.fetchrow(
+            "SELECT uuid, author_id FROM bench_plain.snippets WHERE is_public = false LIMIT 1"
+        )
+        query_args = [sample["author_id"], sample["uuid"]]
+
+        print(f"\n{'query':<20} {'plain ms':>9} {'part ms':>9} {'scanned rels (plain/part)':>27}")
+        for name, template in QUERIES.items():
+            results = []
+            for schema in ("bench_plain", "bench_partitioned"):
+                sql = template.format(schema=schema)
+                used_args = [arg for position, arg in enumerate(query_args, start=1) if f"${position}" in sql]
+                results.append(await run_query(connection, sql, used_args, args.repeat))
+            (plain_ms, plain_scans), (part_ms, part_scans) = results
+            print(f"{name:<20} {plain_ms:>9.3f} {part_ms:>9.3f} {f'{plain_scans}/{part_scans}':>27}")
+    finally:
+        if not args.keep:
+            await connection.execute("DROP SCHEMA IF EXISTS bench_plain CASCADE; "
+                                     "DROP SCHEMA IF EXISTS bench_partitioned CASCADE")
+        await connection.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
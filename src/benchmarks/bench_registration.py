@@ -0,0 +1,98 @@
+"""Registrations per second under a duplicate-heavy sign-up burst.
+
+Runs the same workload against the configured database twice:
+- legacy:   the previous reg_user (bcrypt first, then INSERT, duplicate
+            detected only by the failing commit);
+- pipeline: auth.auth.reg_user (indexed existence check, bcrypt in a
+            thread, INSERT ... ON CONFLICT DO NOTHING RETURNING).
+
+--duplicates sets the share of requests that reuse an already taken email;
+--concurrency requests are in flight at once. Users created by the run are
+deleted afterwards. Run from src/:
+python -m benchmarks.bench_registration [--requests 400] [--duplicates 0.8] [--concurrency 16]
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+from fastapi import HTTPException
+from sqlalchemy import delete
+
+from auth.auth import generate_salt, hash_password, reg_user
+from db.db import async_session, engine
+from models import User
+from schemas.user import UserRegisterSchema
+
+EMAIL_DOMAIN = "bench-registration.example.com"
+
+
+async def legacy_reg_user(user_data: UserRegisterSchema, db):
+    user_salt = generate_salt()
+    db.add(User(**user_data.model_dump(exclude={'password'}), salt=user_salt,
+                hashed_password=hash_password(user_data.password, user_salt)))
+    await db.commit()
+
+
+def workload(requests: int, duplicates: float, run: str) -> list[UserRegisterSchema]:
+    taken = [f"taken-{i}@{EMAIL_DOMAIN}" for i in range(max(1, requests // 20))]
+    users = []
+    for i in range(requests):
+        if random.random() < duplicates:
+            email = random.choice(taken)
+        else:
+            email = f"{run}-{uuid.uuid4().hex}@{EMAIL_DOMAIN}"
+        users.append(UserRegisterSchema(email=email, password="password", name=email.split("@")[0]))
+    return users
+
+
+async def seed_taken(requests: int):
+    for i in range(max(1, requests // 20)):
+        email = f"taken-{i}@{EMAIL_DOMAIN}"
+        async with async_session() as db:
+            try:
+                await reg_user(UserRegisterSchema(email=email, password="password", name=email.split("@")[0]), db)
+            except HTTPException:
+                pass
+
+
+async def run(name: str, register, users: list[UserRegisterSchema], concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    outcomes = {"created": 0, "rejected": 0}
+
+    async def one(user_data: UserRegisterSchema):
+        async with semaphore, async_session() as db:
+            try:
+                await register(user_data, db)
+                outcomes["created"] += 1
+            except Exception:
+                outcomes["rejected"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(user_data) for user_data in users))
+    elapsed = time.perf_counter() - started
+    print(f"{name:<9} {elapsed:8.2f}s {len(users) / elapsed:9.1f} req/s "
+          f"created={outcomes['created']} rejected={outcomes['rejected']}")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--duplicates", type=float, default=0.8)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    try:
+        await seed_taken(args.requests)
+        await run("legacy", legacy_reg_user, workload(args.requests, args.duplicates, "legacy"), args.concurrency)
+        await run("pipeline", reg_user, workload(args.requests, args.duplicates, "pipeline"), args.concurrency)
+    finally:
+        async with async_session() as db:
+            await db.execute(delete(User).where(User.email.like(f"%@{EMAIL_DOMAIN}")))
+            await db.commit()
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+"""Write amplification and read latency of delta-compressed snippet revisions.
+
+Run from src/: python -m benchmarks.bench_revisions [--revisions 200] [--lines 300]
+"""
+import argparse
+import random
+import time
+from types import SimpleNamespace
+
+from core.compression import compress
+from services.revisions import decode_revisions, encode_revision
+
+
+def mutate(lines: list[str], rng: random.Random) -> list[str]:
+    lines = list(lines)
+    for _ in range(rng.randint(1, 5)):
+        position = rng.randrange(len(lines) + 1)
+        action = rng.random()
+        if action < 0.5 and lines:
+            lines[min(position, len(lines) - 1)] = f"    value_{rng.randrange(10 ** 6)} = compute({position})\n"
+        elif action < 0.8:
+            lines.insert(position, f"    log('step {rng.randrange(10 ** 6)}')\n")
+        elif lines:
+            del lines[min(position, len(lines) - 1)]
+    return lines
+
+
+def build_history(revision_count: int, line_count: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    lines = [f"    line_{i} = {i} * factor  # initial\n" for i in range(line_count)]
+    history = []
+    for _ in range(revision_count):
+        history.append("".join(lines))
+        lines = mutate(lines, rng)
+    return history
+
+
+def bench(history: list[str], interval: int) -> dict:
+    revisions, previous = [], None
+    for number, code in enumerate(history, start=1):
+        is_keyframe, codec, payload = encode_revision(number, code, previous, interval)
+        revisions.append(SimpleNamespace(number=number, is_keyframe=is_keyframe, codec=codec, payload=payload))
+        previous = code
+
+    stored = sum(len(r.payload) for r in revisions)
+    full_copies = sum(len(compress(code.encode("utf-8"))[1]) for code in history)
+    logical = sum(len(code.encode("utf-8")) for code in history)
+
+    # Как при чтении из БД: цепочка от ближайшей опорной ревизии до запрошенной
+    latencies = []
+    for target in (1, len(revisions) // 2, len(revisions)):
+        keyframe = max(r.number for r in revisions[:target] if r.is_keyframe)
+        chain = revisions[keyframe - 1:target]
+        started = time.perf_counter()
+        for _ in range(50):
+            code = decode_revisions(chain)
+        latencies.append((time.perf_counter() - started) / 50 * 1000)
+        assert code == history[target - 1]
+    return {
+        "interval": interval,
+        "stored_kb": stored / 1024,
+        "vs_full_copies": stored / full_copies,
+        "vs_logical": stored / logical,
+        "read_ms": latencies,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--revisions", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=13)
+    args = parser.parse_args()
+
+    for revision_count in (10, 50, args.revisions):
+        history = build_history(revision_count, args.lines, args.seed)
+        print(f"\n{revision_count} revisions x ~{args.lines} lines")
+        print(f"{'interval':>8} {'stored KB':>10} {'/full':>7} {'/raw':>7}  read ms (first / middle / last)")
+        for interval in (1, 5, 20, 50):
+            r = bench(history, interval)
+            reads = " / ".join(f"{ms:.3f}" for ms in r["read_ms"])
+            print(f"{r['interval']:>8} {r['stored_kb']:>10.1f} {r['vs_full_copies']:>7.3f} {r['vs_logical']:>7.3f}  {reads}")
+
+
+if __name__ == '__main__':
+    main()
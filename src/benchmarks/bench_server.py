@@ -0,0 +1,101 @@
+"""Throughput of the dev launch mode (reload, default loop/parser) versus prod mode.
+
+Starts `python main.py` once per mode on its own port and drives /health/live
+with a fixed number of concurrent keep-alive clients.
+
+Run from src/: python -m benchmarks.bench_server [--duration 10] [--concurrency 64]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+MODES = {
+    "dev (current defaults)": {"SERVER_MODE": "dev", "RELOAD": "true"},
+    "prod": {"SERVER_MODE": "prod"},
+}
+
+
+async def wait_ready(url: str, timeout: float = 30.0) -> float:
+    started = time.perf_counter()
+    async with httpx.AsyncClient() as client:
+        while time.perf_counter() - started < timeout:
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.05)
+    raise TimeoutError(f"{url} did not become ready in {timeout}s")
+
+
+async def drive(url: str, duration: float, concurrency: int) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits) as client:
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / duration,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "errors": errors,
+    }
+
+
+def run_mode(name: str, overrides: dict, port: int, args) -> dict:
+    env = {**os.environ, **overrides, "APP_PORT": str(port), "APP_HOST": "127.0.0.1"}
+    if args.workers:
+        env["CPU_COUNT"] = str(args.workers)
+    process = subprocess.Popen([sys.executable, "main.py"], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        url = f"http://127.0.0.1:{port}/health/live"
+        startup = asyncio.run(wait_ready(url))
+        asyncio.run(drive(url, 1.0, args.concurrency))  # прогрев
+        result = asyncio.run(drive(url, args.duration, args.concurrency))
+        result["startup_s"] = startup
+        return result
+    finally:
+        process.terminate()
+        process.wait(timeout=15)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--workers", type=int, help="Worker count for prod mode (default: cpu count)")
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+
+    print(f"{'mode':<24} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'startup s':>10}")
+    for offset, (name, overrides) in enumerate(MODES.items()):
+        r = run_mode(name, overrides, args.port + offset, args)
+        print(f"{name:<24} {r['rps']:>9.0f} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} "
+              f"{r['errors']:>7} {r['startup_s']:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Per-request statement overhead of the hot queries, before and after lambda statements.
+
+Measures, without a database, what SQLAlchemy does for every execute of a
+hot query before any I/O happens:
+- compile:    building the select() and compiling it (what every call would
+              cost without a compiled cache, and what a cache miss costs);
+- select():   building the select() and generating its cache key, i.e. the
+              per-call cost on a compiled-cache hit before this change;
+- lambda:     lambda_stmt() from db.queries plus its cache key, i.e. the
+              per-call cost after this change.
+
+Run from src/: python -m benchmarks.bench_statements [--iterations 20000]
+"""
+import argparse
+import time
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql.asyncpg import dialect as asyncpg_dialect
+from sqlalchemy.orm import joinedload
+
+from db.queries import snippet_by_uuid_stmt, user_by_email_stmt
+from models import User
+from models.snippet import Snippet
+
+
+def snippet_select(snippet_uuid):
+    return (
+        select(Snippet)
+        .options(joinedload(Snippet.author), joinedload(Snippet.code_blob))
+        .where(Snippet.uuid == snippet_uuid)
+    )
+
+
+def user_select(email):
+    return select(User).where(User.email == email)
+
+
+def per_call_us(fn, iterations: int) -> float:
+    for _ in range(min(iterations, 1000)):
+        fn()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    dialect = asyncpg_dialect()
+    value_uuid, value_email = uuid.uuid4(), "user@example.com"
+
+    cases = {
+        "get_snippet_by_uuid": (lambda: snippet_select(value_uuid), lambda: snippet_by_uuid_stmt(value_uuid)),
+        "user by email (auth)": (lambda: user_select(value_email), lambda: user_by_email_stmt(value_email)),
+    }
+    print(f"{'query':<22} {'compile us':>11} {'select() us':>12} {'lambda us':>10} {'speedup':>8}")
+    for name, (build, build_lambda) in cases.items():
+        compile_us = per_call_us(lambda: build().compile(dialect=dialect), args.iterations // 10)
+        select_us = per_call_us(lambda: build()._generate_cache_key(), args.iterations)
+        lambda_us = per_call_us(lambda: build_lambda()._generate_cache_key(), args.iterations)
+        print(f"{name:<22} {compile_us:>11.1f} {select_us:>12.1f} {lambda_us:>10.1f} {select_us / lambda_us:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
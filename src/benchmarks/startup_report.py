@@ -0,0 +1,150 @@
+"""Worker cold-start report: per-module import cost and time to first request.
+
+Import cost comes from `python -X importtime -c "import main"` in a fresh
+interpreter. Time to first request is measured from spawning `python main.py`
+to the first 200 from /health/live. With --max-import-ms/--max-first-request-ms
+the script exits non-zero when a budget is exceeded, so CI can use it as a
+regression gate.
+
+The gate also fails when `import main` pulls in a module that must stay
+deferred (DEFERRED_PACKAGES: compression, rate-limit store, highlighting and
+auth backends load on first use or in lifespan warmup), or when a package
+that is known to stay eager exceeds its budget (EAGER_PACKAGE_BUDGETS_MS).
+email_validator is such a package: FastAPI itself imports it from
+fastapi.openapi.models whenever it is installed, so the app cannot defer it.
+Measured at about 25-35 ms of a 700-1000 ms `import main` (mostly compiling
+the RFC regexes in email_validator.rfc_constants). The budget catches it
+growing without breaking on timing noise.
+
+Run from src/: python -m benchmarks.startup_report [--top 25] [--runs 3]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+# Пакеты, которые не должны загружаться при импорте приложения
+DEFERRED_PACKAGES = ("zstandard", "sqlite3", "pygments", "passlib", "bcrypt", "jose")
+# Пакеты, которые остаются в импорте приложения, и их бюджет собственного времени в мс
+EAGER_PACKAGE_BUDGETS_MS = {"email_validator": 75.0}
+
+
+# Разбор вывода -X importtime: (self_us, cumulative_us, уровень вложенности, модуль)
+def parse_importtime(stderr: str) -> list[tuple[int, int, int, str]]:
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return entries
+
+
+def measure_imports(module: str) -> tuple[float, dict[str, float]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    entries = parse_importtime(result.stderr)
+    # Стоимость по пакетам верхнего уровня - сумма собственного времени всех их модулей
+    packages: dict[str, float] = defaultdict(float)
+    for self_us, _, _, name in entries:
+        packages[name.split(".")[0]] += self_us / 1000
+    total = next(cumulative for _, cumulative, depth, name in reversed(entries) if name == module) / 1000
+    return total, dict(packages)
+
+
+def measure_first_request(port: int, timeout: float = 60.0) -> float:
+    env = {**os.environ, "APP_HOST": "127.0.0.1", "APP_PORT": str(port),
+           "SERVER_MODE": "prod", "CPU_COUNT": "1"}
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "main.py"], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health/live", timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - started) * 1000
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        raise TimeoutError("worker did not serve /health/live in time")
+    finally:
+        process.terminate()
+        process.wait(timeout=15)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per measurement; median is reported")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--skip-first-request", action="store_true")
+    parser.add_argument("--max-import-ms", type=float)
+    parser.add_argument("--max-first-request-ms", type=float)
+    parser.add_argument("--max-package-ms", action="append", default=[], metavar="PACKAGE=MS",
+                        help="Budget for one package's import time; overrides EAGER_PACKAGE_BUDGETS_MS")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    # Первый прогон только компилирует .pyc, чтобы не мерить холодный диск
+    measure_imports(args.module)
+    runs = [measure_imports(args.module) for _ in range(args.runs)]
+    import_ms = statistics.median(total for total, _ in runs)
+    packages = {
+        name: statistics.median(packages.get(name, 0.0) for _, packages in runs)
+        for name in runs[0][1]
+    }
+    first_request_ms = None
+    if not args.skip_first_request:
+        first_request_ms = statistics.median(measure_first_request(args.port) for _ in range(args.runs))
+
+    top = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]
+    if args.json:
+        print(json.dumps({
+            "import_ms": round(import_ms, 1),
+            "first_request_ms": first_request_ms and round(first_request_ms, 1),
+            "packages_ms": {name: round(ms, 2) for name, ms in top},
+        }, indent=2))
+    else:
+        print(f"import {args.module}: {import_ms:.1f} ms")
+        if first_request_ms is not None:
+            print(f"spawn to first request: {first_request_ms:.1f} ms")
+        print(f"\n{'package':<28} {'self ms':>9} {'share':>7}")
+        for name, ms in top:
+            print(f"{name:<28} {ms:>9.2f} {ms / import_ms:>7.1%}")
+
+    failed = False
+    deferred = [name for name in DEFERRED_PACKAGES if name in packages]
+    if deferred:
+        print(f"FAIL: import {args.module} loads deferred packages: {', '.join(deferred)}", file=sys.stderr)
+        failed = True
+    budgets = dict(EAGER_PACKAGE_BUDGETS_MS)
+    for budget in args.max_package_ms:
+        name, ms = budget.split("=", 1)
+        budgets[name] = float(ms)
+    for name, budget_ms in budgets.items():
+        if packages.get(name, 0.0) > budget_ms:
+            print(f"FAIL: {name} import {packages[name]:.1f} ms > budget {budget_ms} ms", file=sys.stderr)
+            failed = True
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        print(f"FAIL: import {import_ms:.1f} ms > budget {args.max_import_ms} ms", file=sys.stderr)
+        failed = True
+    if (args.max_first_request_ms is not None and first_request_ms is not None
+            and first_request_ms > args.max_first_request_ms):
+        print(f"FAIL: first request {first_request_ms:.1f} ms > budget {args.max_first_request_ms} ms",
+              file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Optional
+
+from fastapi import Request
+from starlette.responses import JSONResponse, Response
+
+from core.config import settings
+
+if TYPE_CHECKING:
+    import sqlite3
+
+logger = logging.getLogger("my_app")
+
+
+# Token bucket в общем для всех воркеров SQLite-файле
+class TokenBucketStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._connection: Optional["sqlite3.Connection"] = None
+        # take() выполняется в потоках пула, а соединение SQLite у хранилища одно
+        self._lock = threading.Lock()
+
+    # sqlite3 импортируется при первом обращении к хранилищу, а не при импорте приложения
+    def _connect(self) -> "sqlite3.Connection":
+        import sqlite3
+
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            # Состояние лимитов эфемерное, поэтому fsync на каждую запись не нужен
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            self._connection = connection
+        return self._connection
+
+    # Забирает один токен; возвращает 0, если запрос разрешён, иначе сколько секунд ждать.
+    # Блокирующий вызов: BEGIN IMMEDIATE ждёт другие воркеры до timeout, поэтому не для event loop
+    def take(self, key: str, rate: float, burst: int) -> float:
+        with self._lock:
+            return self._take(key, rate, burst)
+
+    def _take(self, key: str, rate: float, burst: int) -> float:
+        import sqlite3
+
+        connection = self._connect()
+        now = time.time()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+            retry_after = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                retry_after = (1 - tokens) / rate
+            connection.execute(
+                "INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now),
+            )
+            connection.execute("COMMIT")
+            return retry_after
+        except sqlite3.Error as ex:
+            # Недоступное хранилище не должно ронять API - пропускаем запрос
+            logger.error(f"Rate limit store error: {ex}")
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            return 0.0
+
+
+class RouteLimiter:
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.waiting = 0
+
+
+class AdmissionController:
+    def __init__(self):
+        self.buckets = TokenBucketStore(settings.rate_limit_store)
+        # Запросы, которые сейчас обрабатываются; ожидающие слота маршрута считаются в RouteLimiter.waiting
+        self.in_flight = 0
+        self._limiters: dict[str, RouteLimiter] = {}
+        self._pool_waits: deque[tuple[float, float]] = deque(maxlen=1024)
+
+    # Время ожидания соединения из пула, замеряется в get_async_session
+    def record_pool_wait(self, seconds: float):
+        self._pool_waits.append((time.monotonic(), seconds))
+
+    # Среднее ожидание пула за последние admission_window секунд
+    @property
+    def pool_wait_ms(self) -> float:
+        horizon = time.monotonic() - settings.admission_window
+        while self._pool_waits and self._pool_waits[0][0] < horizon:
+            self._pool_waits.popleft()
+        if not self._pool_waits:
+            return 0.0
+        return sum(wait for _, wait in self._pool_waits) / len(self._pool_waits) * 1000
+
+    @property
+    def waiting(self) -> int:
+        return sum(limiter.waiting for limiter in self._limiters.values())
+
+    # Глубина очереди воркера: обрабатываемые запросы и ожидающие слота маршрута
+    @property
+    def queue_depth(self) -> int:
+        return self.in_flight + self.waiting
+
+    @property
+    def overloaded(self) -> bool:
+        return self.queue_depth >= settings.shed_queue_depth or self.pool_wait_ms >= settings.shed_pool_wait_ms
+
+    def _limiter(self, path: str) -> Optional[RouteLimiter]:
+        for prefix, limit in settings.route_concurrency_limits.items():
+            if path.startswith(prefix):
+                if prefix not in self._limiters:
+                    self._limiters[prefix] = RouteLimiter(limit)
+                return self._limiters[prefix]
+        return None
+
+    def _rate_limit_keys(self, request: Request) -> list[tuple[str, float, int]]:
+        keys = []
+        # За доверенным прокси uvicorn уже подставил в client адрес из X-Forwarded-For
+        if request.client is not None:
+            keys.append((f"ip:{request.client.host}", settings.rate_limit_ip_per_second, settings.rate_limit_ip_burst))
+        user = _token_subject(request)
+        if user is not None:
+            keys.append((f"user:{user}", settings.rate_limit_user_per_second, settings.rate_limit_user_burst))
+        return keys
+
+    def status(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "queue_depth": self.queue_depth,
+            "pool_wait_ms": round(self.pool_wait_ms, 2),
+            "queued": {prefix: limiter.waiting for prefix, limiter in self._limiters.items()},
+            "overloaded": self.overloaded,
+        }
+
+    # Решение о допуске запроса: ответ-отказ или занятый слот маршрута (None, если лимита на маршруте нет).
+    # Допущенный запрос обязан вызвать release() со своим слотом
+    async def admit(self, request: Request) -> tuple[Optional[Response], Optional[RouteLimiter]]:
+        if self.overloaded:
+            return reject(503, "Service overloaded, retry later", settings.shed_retry_after), None
+
+        for key, rate, burst in self._rate_limit_keys(request):
+            # Хранилище лимитов общее для воркеров и может ждать блокировку - не держим event loop
+            retry_after = await asyncio.to_thread(self.buckets.take, key, rate, burst)
+            if retry_after:
+                return reject(429, "Too many requests", retry_after), None
+
+        limiter = self._limiter(request.url.path)
+        if limiter is not None:
+            if limiter.waiting >= settings.admission_queue_limit:
+                return reject(503, "Too many concurrent requests, retry later", settings.shed_retry_after), None
+            limiter.waiting += 1
+            try:
+                await asyncio.wait_for(limiter.semaphore.acquire(), settings.admission_queue_timeout)
+            except asyncio.TimeoutError:
+                return reject(503, "Too many concurrent requests, retry later", settings.shed_retry_after), None
+            finally:
+                limiter.waiting -= 1
+        self.in_flight += 1
+        return None, limiter
+
+    def release(self, limiter: Optional[RouteLimiter]):
+        self.in_flight -= 1
+        if limiter is not None:
+            limiter.semaphore.release()
+
+
+# ASGI middleware admission control. Слот и счётчик освобождаются в finally вокруг всего вызова
+# приложения: и после отдачи потокового тела, и если клиент отключился до первого байта ответа
+class AdmissionMiddleware:
+    def __init__(self, app, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or admission
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith("/health"):
+            await self.app(scope, receive, send)
+            return
+
+        rejection, limiter = await self.controller.admit(Request(scope))
+        if rejection is not None:
+            await rejection(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(limiter)
+
+
+# Email пользователя из JWT без обращения к базе; невалидный токен отсеется авторизацией
+def _token_subject(request: Request) -> Optional[str]:
+    authorization = request.headers.get("Authorization", "")
+    if not authorization.lower().startswith("bearer "):
+        return None
+    from jose import jwt, JWTError
+    try:
+        payload = jwt.decode(authorization[7:], settings.jwt_secret, algorithms=[settings.algorithm])
+    except JWTError:
+        return None
+    return payload.get("sub")
+
+
+def reject(status_code: int, message: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content={"message": message},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+admission = AdmissionController()
@@ -0,0 +1,70 @@
+import hashlib
+import importlib.util
+import zlib
+from functools import lru_cache
+
+from core.config import settings
+
+CODEC_NONE = "none"
+CODEC_ZLIB = "zlib"
+CODEC_ZSTD = "zstd"
+# zstandard - необязательная зависимость; без неё тела кода сжимаются zlib.
+# При импорте модуля только проверяем наличие, сам пакет загружается при первом сжатии
+DEFAULT_CODEC = CODEC_ZSTD if importlib.util.find_spec("zstandard") is not None else CODEC_ZLIB
+
+
+@lru_cache(maxsize=None)
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstandard is required to read zstd-compressed data")
+    return zstandard
+
+
+# Ключ блоба - sha256 от несжатых байтов
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+# Сжимаем данные; если сжатие не дало выигрыша, храним как есть
+def compress(data: bytes, codec: str = DEFAULT_CODEC) -> tuple[str, bytes]:
+    if codec == CODEC_ZSTD:
+        packed = _zstandard().ZstdCompressor(level=settings.code_compression_level).compress(data)
+    elif codec == CODEC_ZLIB:
+        packed = zlib.compress(data, min(settings.code_compression_level, 9))
+    else:
+        return CODEC_NONE, data
+    if len(packed) >= len(data):
+        return CODEC_NONE, data
+    return codec, packed
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if codec == CODEC_ZSTD:
+        return _zstandard().ZstdDecompressor().decompressobj().decompress(data)
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(data)
+    return bytes(data)
+
+
+# Потоковое сжатие для тел, которые не собираются в памяти целиком
+class StreamCompressor:
+    def __init__(self, codec: str = DEFAULT_CODEC):
+        self.codec = codec
+        if codec == CODEC_ZSTD:
+            self._compressor = _zstandard().ZstdCompressor(level=settings.code_compression_level).compressobj()
+        elif codec == CODEC_ZLIB:
+            self._compressor = zlib.compressobj(min(settings.code_compression_level, 9))
+        else:
+            self._compressor = None
+
+    def update(self, data: bytes) -> bytes:
+        return data if self._compressor is None else self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return b"" if self._compressor is None else self._compressor.flush()
+
+
+def decompress_text(data: bytes, codec: str) -> str:
+    return decompress(data, codec).decode("utf-8")
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import time
+
+from fastapi import Request
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session
+
+from core.config import settings
+
+logger = logging.getLogger("my_app")
+
+# SQLSTATE query_canceled: сработал statement_timeout или запрос отменён
+QUERY_CANCELED_SQLSTATE = "57014"
+
+
+# Дедлайн маршрута в миллисекундах; 0 - без ограничения
+def route_deadline_ms(request: Request) -> int:
+    route = request.scope.get("route")
+    path = getattr(route, "path", request.url.path)
+    return settings.route_deadlines_ms.get(path, settings.request_deadline_ms)
+
+
+# statement_timeout обновляется перед запросом, если с прошлой установки остаток дедлайна
+# уменьшился больше чем на столько миллисекунд: так запрос не переживёт дедлайн дольше этого запаса,
+# а лишний round-trip не добавляется к каждому запросу
+STATEMENT_TIMEOUT_SLACK_MS = 50
+
+_SET_STATEMENT_TIMEOUT = text("SELECT set_config('statement_timeout', :timeout, true)")
+
+
+def _remaining_ms(deadline: float) -> int:
+    return max(1, int((deadline - time.monotonic()) * 1000))
+
+
+# statement_timeout транзакции - оставшееся до дедлайна время, а не весь бюджет маршрута:
+# он выставляется в начале каждой транзакции сессии и уменьшается перед следующими запросами
+def apply_statement_timeout(session: Session, deadline_ms: int):
+    deadline = time.monotonic() + deadline_ms / 1000
+
+    @event.listens_for(session, "after_begin")
+    def set_statement_timeout(_session, _transaction, connection):
+        applied_ms = _remaining_ms(deadline)
+        connection.execute(_SET_STATEMENT_TIMEOUT, {"timeout": str(applied_ms)})
+
+        @event.listens_for(connection, "before_cursor_execute")
+        def refresh_statement_timeout(conn, _cursor, _statement, _parameters, _context, _executemany):
+            nonlocal applied_ms
+            remaining_ms = _remaining_ms(deadline)
+            if applied_ms - remaining_ms <= STATEMENT_TIMEOUT_SLACK_MS:
+                return
+            # Отдельный курсор адаптера: событие не срабатывает повторно, курсор запроса не затрагивается
+            compiled = _SET_STATEMENT_TIMEOUT.compile(dialect=conn.dialect)
+            params = compiled.construct_params({"timeout": str(remaining_ms)})
+            cursor = conn.connection.cursor()
+            try:
+                cursor.execute(compiled.string, tuple(params[name] for name in compiled.positiontup))
+            finally:
+                cursor.close()
+            applied_ms = remaining_ms
+
+
+# ASGI middleware: отменяет обработку запроса, если клиент отключился, не дождавшись ответа.
+# Отключение видно только в сыром receive сервера, поэтому после того как тело запроса прочитано,
+# receive слушает этот слой; приложение получает http.disconnect от него же
+class CancelOnDisconnectMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.cancel_on_disconnect:
+            await self.app(scope, receive, send)
+            return
+
+        body_done = asyncio.Event()
+        disconnected = asyncio.Event()
+        response_done = False
+        pending: list[dict] = []
+
+        # Запрос без тела: его единственное сообщение забираем сразу, иначе наблюдение не начнётся,
+        # пока обработчик сам не вызовет receive (а обработчики без тела его не вызывают)
+        headers = dict(scope["headers"])
+        if headers.get(b"content-length", b"0") == b"0" and b"transfer-encoding" not in headers:
+            message = await receive()
+            pending.append(message)
+            if message["type"] == "http.disconnect":
+                return
+            if not message.get("more_body", False):
+                body_done.set()
+
+        async def app_receive():
+            if pending:
+                return pending.pop()
+            if body_done.is_set():
+                await disconnected.wait()
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected.set()
+            elif not message.get("more_body", False):
+                body_done.set()
+            return message
+
+        async def app_send(message):
+            nonlocal response_done
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_done = True
+            await send(message)
+
+        app_task = asyncio.create_task(self.app(scope, app_receive, app_send))
+
+        async def watch():
+            await body_done.wait()
+            message = await receive()
+            if message["type"] != "http.disconnect":
+                return
+            disconnected.set()
+            # После отдачи ответа сервер тоже сообщает об отключении; фоновые задачи не прерываем
+            if not response_done and not app_task.done():
+                logger.warning(f"{scope['path']} | Client disconnected, cancelling request")
+                app_task.cancel()
+
+        watcher = asyncio.create_task(watch())
+        try:
+            await app_task
+        except asyncio.CancelledError:
+            # Отменили мы сами - клиенту отвечать уже некому; отмену самого воркера пробрасываем
+            if asyncio.current_task().cancelling() or not (disconnected.is_set() and app_task.cancelled()):
+                raise
+        finally:
+            watcher.cancel()
+
+
+def is_statement_timeout(exc: BaseException) -> bool:
+    return isinstance(exc, DBAPIError) and getattr(exc.orig, "sqlstate", None) == QUERY_CANCELED_SQLSTATE
+
+
+def is_pool_timeout(exc: BaseException) -> bool:
+    return isinstance(exc, PoolTimeoutError)
@@ -0,0 +1,84 @@
+import json
+
+from starlette import status
+
+from core.config import settings
+
+
+# Лимит тела запроса для пути: самый длинный подходящий префикс или общий лимит
+def body_limit_for(path: str) -> int:
+    matches = [prefix for prefix in settings.route_body_limits if path.startswith(prefix)]
+    if not matches:
+        return settings.max_request_body_bytes
+    return settings.route_body_limits[max(matches, key=len)]
+
+
+# ASGI middleware: отклоняет большие тела по Content-Length сразу,
+# а тела без него (chunked) - как только прочитанный объём превысит лимит
+class BodySizeLimitMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = body_limit_for(scope["path"])
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length is not None:
+            try:
+                declared = int(content_length)
+            except ValueError:
+                await self._reject(send, status.HTTP_400_BAD_REQUEST, "Invalid Content-Length header")
+                return
+            if declared > limit:
+                await self._reject(send, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                   f"Request body exceeds {limit} bytes")
+                return
+
+        received = 0
+        overflowed = False
+        response_started = False
+
+        # После превышения лимита приложение больше не получает тело: для него клиент отключился,
+        # а ответ 413 middleware отправляет само
+        async def limited_receive():
+            nonlocal received, overflowed
+            if overflowed:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    overflowed = True
+                    return {"type": "http.disconnect"}
+            return message
+
+        # Ответ, который приложение строит из-за оборванного тела (400 разбора, 500), клиенту не уходит
+        async def tracking_send(message):
+            nonlocal response_started
+            if overflowed and not response_started:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except Exception:
+            if not overflowed or response_started:
+                raise
+        if overflowed and not response_started:
+            await self._reject(send, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, f"Request body exceeds {limit} bytes")
+
+    @staticmethod
+    async def _reject(send, status_code: int, message: str):
+        body = json.dumps({"message": message}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -47,7 +47,7 @@ LOGGING_CONFIG = {
 }
 
 
-def setup_logging():
+def setup_logging() -> logging.handlers.QueueListener:
     # Очередь для передачи логов
     log_queue = Queue(-1)
 
@@ -60,4 +60,5 @@ def setup_logging():
     listener.start()
 
     # Добавляем QueueHandler в логгер
-    logging.getLogger().addHandler(queue_handler)
\ No newline at end of file
+    logging.getLogger().addHandler(queue_handler)
+    return listener
@@ -1,15 +1,32 @@
-from fastapi import Depends
+import asyncio
+import logging
+import time
+
+from fastapi import Depends, Request
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import (async_sessionmaker, create_async_engine, AsyncSession, AsyncEngine, AsyncConnection)
+from core.admission import admission
 from core.config import settings
+from core.deadlines import apply_statement_timeout, route_deadline_ms
+from db.queries import hot_statements, prepare_hot_statements
 from typing import Union, Callable, Annotated
 
+logger = logging.getLogger("my_app")
+
 
 class InternalError(Exception):
     pass
 
 
-async def get_async_session() -> AsyncSession:
+async def get_async_session(request: Request) -> AsyncSession:
     async with async_session() as session:
+        deadline_ms = route_deadline_ms(request)
+        if deadline_ms:
+            apply_statement_timeout(session.sync_session, deadline_ms)
+        # Замер ожидания соединения из пула для admission control
+        started = time.perf_counter()
+        await session.connection()
+        admission.record_pool_wait(time.perf_counter() - started)
         try:
             yield session
         except InternalError:
@@ -26,8 +43,36 @@ def create_session_maker(
     )
 
 
-engine = create_async_engine(settings.postgres_dsn.unicode_string())
+# Открываем соединения пула заранее, чтобы первые запросы не платили за подключение;
+# заодно горячие запросы попадают в кэш скомпилированных выражений движка
+async def warmup_pool():
+    async def ping():
+        async with async_session() as session:
+            for statement in hot_statements():
+                await session.execute(statement)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(ping() for _ in range(settings.db_pool_size)), return_exceptions=True)
+    errors = [result for result in results if isinstance(result, Exception)]
+    if errors:
+        logger.error(f"DB pool warmup failed: {errors[0]}")
+    else:
+        logger.info(f"DB pool warmed up in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+engine = create_async_engine(
+    settings.postgres_dsn.unicode_string(),
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+)
 
 async_session = create_session_maker(engine)
 
+
+@event.listens_for(engine.sync_engine, "connect")
+def on_connect(dbapi_connection, connection_record):
+    prepare_hot_statements(engine.dialect, dbapi_connection)
+
+
 db_dependency = Annotated[AsyncSession, Depends(get_async_session)]
@@ -0,0 +1,58 @@
+import logging
+import uuid
+
+from sqlalchemy import exists, lambda_stmt, or_, select
+from sqlalchemy.orm import joinedload
+
+from models import User
+from models.snippet import Snippet
+
+logger = logging.getLogger("my_app")
+
+
+# Горячие запросы как lambda-statements: конструкция и ключ кэша строятся один раз,
+# а значения из замыкания подставляются как связанные параметры
+def snippet_by_uuid_stmt(snippet_uuid):
+    return lambda_stmt(
+        lambda: select(Snippet)
+        .options(joinedload(Snippet.author), joinedload(Snippet.code_blob))
+        .where(Snippet.uuid == snippet_uuid)
+    )
+
+
+def user_by_email_stmt(email: str):
+    return lambda_stmt(
+        lambda: select(User).options(joinedload(User.snippet_counts)).where(User.email == email)
+    )
+
+
+# Проверка занятости email или имени по уникальным индексам users, без загрузки строки
+def user_exists_stmt(email: str, name: str):
+    return lambda_stmt(lambda: select(exists().where(or_(User.email == email, User.name == name))))
+
+
+# Параметры-заглушки для прогрева: запросы с ними ничего не находят
+def hot_statements() -> list:
+    return [
+        snippet_by_uuid_stmt(uuid.UUID(int=0)),
+        user_by_email_stmt(""),
+        user_exists_stmt("", ""),
+    ]
+
+
+# Готовит горячие запросы на новом соединении пула (событие engine "connect"):
+# курсор адаптера asyncpg кладёт подготовленный statement в свой кэш соединения
+def prepare_hot_statements(dialect, dbapi_connection):
+    cursor = dbapi_connection.cursor()
+    try:
+        for statement in hot_statements():
+            compiled = statement.compile(dialect=dialect)
+            params = compiled.construct_params()
+            cursor.execute(compiled.string, tuple(params[name] for name in compiled.positiontup))
+            cursor.fetchall()
+    except Exception as ex:
+        logger.error(f"Hot statement prepare failed: {ex}")
+    finally:
+        cursor.close()
+        # Адаптер открыл транзакцию на execute - закрываем её до выдачи соединения из пула
+        dbapi_connection.rollback()
@@ -1,42 +1,40 @@
 import atexit
 import logging
-import logging.config
-import logging.handlers
-from queue import Queue
 from contextlib import asynccontextmanager
 from typing import AsyncContextManager
 
 import uvicorn
 from fastapi import FastAPI, Request, HTTPException
+from sqlalchemy.exc import DBAPIError, TimeoutError as SQLAlchemyTimeoutError
 from starlette.responses import JSONResponse
 
+from core.admission import AdmissionMiddleware
 from core.config import uvicorn_options
+from core.deadlines import CancelOnDisconnectMiddleware, is_pool_timeout, is_statement_timeout
+from core.limits import BodySizeLimitMiddleware
 from api.v1 import api_router
-from core.logger import setup_logging, LOGGING_CONFIG
+from auth.auth import warmup_auth
+from db.db import warmup_pool
+from core.logger import setup_logging
+from services.highlight import shutdown_executor
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncContextManager[None]:
-    logging.config.dictConfig(LOGGING_CONFIG)
-    log_queue = Queue(-1)
-
-    # Получаем корневой логгер и находим обработчик очереди
-    root_logger = logging.getLogger()
-    queue_handler = logging.handlers.QueueHandler(log_queue)
-    listener = logging.handlers.QueueListener(log_queue, *root_logger.handlers)
-
-    # Добавляем QueueHandler к корневому логгеру
-    root_logger.addHandler(queue_handler)
+    # Логирование настраивается при старте воркера, а не при импорте модуля
+    listener = setup_logging()
 
     try:
-        listener.start()
         atexit.register(listener.stop)
+        # Воркер начинает принимать запросы только после прогрева
+        warmup_auth()
+        await warmup_pool()
         yield
     finally:
+        shutdown_executor()
         listener.stop()
 
 
-setup_logging()
 app = FastAPI(lifespan=lifespan, docs_url="/api/openapi")
 logger = logging.getLogger("my_app")
 
@@ -56,6 +54,8 @@ async def error_middleware(request: Request, call_next):
             content={"message": exc.detail}
         )
     except Exception as e:
+        if is_statement_timeout(e) or is_pool_timeout(e):
+            return await deadline_exception_handler(request, e)
         logger.error(f"{request.url} | Error in application: {e}")
         return JSONResponse(
             status_code=500,
@@ -63,7 +63,31 @@ async def error_middleware(request: Request, call_next):
         )
 
 
+# Admission control: сброс нагрузки и rate limiting до обработки запроса
+app.add_middleware(AdmissionMiddleware)
+
+# Отмена обработки при отключении клиента; снаружи admission, чтобы отменялось и ожидание слота
+app.add_middleware(CancelOnDisconnectMiddleware)
+
+
+# Ограничение размера тела запроса: самый внешний слой, до чтения тела
+app.add_middleware(BodySizeLimitMiddleware)
+
+
 # Обработчики исключений
+@app.exception_handler(DBAPIError)
+@app.exception_handler(SQLAlchemyTimeoutError)
+async def deadline_exception_handler(request: Request, exc: Exception):
+    if is_statement_timeout(exc):
+        logger.error(f"{request.url} | Request deadline exceeded: {exc}")
+        return JSONResponse(status_code=504, content={"message": "Request deadline exceeded"})
+    if is_pool_timeout(exc):
+        logger.error(f"{request.url} | DB pool timeout: {exc}")
+        return JSONResponse(status_code=503, content={"message": "Service temporarily unavailable"},
+                            headers={"Retry-After": "1"})
+    return await generic_exception_handler(request, exc)
+
+
 @app.exception_handler(Exception)
 async def generic_exception_handler(request: Request, exc: Exception):
     logger.error(f"{request.url} | Error in application: {exc}")
@@ -0,0 +1,101 @@
+import argparse
+import asyncio
+import sys
+
+from sqlalchemy import select
+
+from core.config import settings
+from db.db import async_session, engine
+from models import User
+from services.counters import reconcile_snippet_counts
+from services.importer import guess_import_format, import_snippets, iter_file_chunks
+from services.partitioning import partition_snippets
+from services.storage import prune_orphan_blobs, storage_report
+
+
+# Импорт сниппетов из файла от имени пользователя с указанным email
+async def run_import(args: argparse.Namespace) -> int:
+    async with async_session() as db:
+        result = await db.execute(select(User.id).where(User.email == args.author_email))
+        author_id = result.scalar_one_or_none()
+        if author_id is None:
+            print(f"User {args.author_email} not found", file=sys.stderr)
+            return 1
+
+        def on_progress(report):
+            print(f"processed={report.processed} imported={report.imported} "
+                  f"failed={report.failed} rows/s={report.rows_per_second}", file=sys.stderr)
+
+        report = await import_snippets(
+            db, iter_file_chunks(args.path), author_id=author_id,
+            import_format=args.format or guess_import_format(args.path),
+            batch_size=args.batch_size, on_progress=on_progress,
+            quota=None if args.ignore_quota else settings.snippet_quota,
+        )
+    for error in report.errors:
+        print(f"line {error['line']}: {error['error']}", file=sys.stderr)
+    print(report.model_dump_json(exclude={"errors"}))
+    return 0 if not report.failed else 2
+
+
+# Отчёт об экономии места на хранении тел кода
+async def run_storage_report(args: argparse.Namespace) -> int:
+    async with async_session() as db:
+        if args.prune:
+            print(f"pruned_blobs: {await prune_orphan_blobs(db)}")
+        for key, value in (await storage_report(db)).items():
+            print(f"{key}: {value}")
+    return 0
+
+
+# Сверка счётчиков сниппетов пользователей с таблицей snippets
+async def run_reconcile_counts(args: argparse.Namespace) -> int:
+    async with async_session() as db:
+        print(f"fixed_users: {await reconcile_snippet_counts(db)}")
+    return 0
+
+
+# Перевод таблицы snippets на партиции; единственный способ включить партиционирование.
+# Запускается на базе после alembic upgrade head, повторный запуск безопасен
+async def run_partition_snippets(args: argparse.Namespace) -> int:
+    def on_progress(moved):
+        print(f"moved={moved}", file=sys.stderr)
+
+    moved = await partition_snippets(engine, partitions=args.partitions, split_public=args.split_public,
+                                     batch_size=args.batch_size, on_progress=on_progress)
+    print("already partitioned" if moved is None else f"partitioned: moved={moved}")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Code Snippet API management commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="Bulk import snippets from NDJSON/CSV")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--author-email", required=True)
+    import_parser.add_argument("--format", choices=["ndjson", "csv"])
+    import_parser.add_argument("--batch-size", type=int, default=5000)
+    import_parser.add_argument("--ignore-quota", action="store_true", help="Import past the per-user snippet quota")
+    import_parser.set_defaults(handler=run_import)
+
+    report_parser = commands.add_parser("storage-report", help="Show code storage savings")
+    report_parser.add_argument("--prune", action="store_true", help="Delete unreferenced code blobs first")
+    report_parser.set_defaults(handler=run_storage_report)
+
+    counts_parser = commands.add_parser("reconcile-counts", help="Repair drift in per-user snippet counters")
+    counts_parser.set_defaults(handler=run_reconcile_counts)
+
+    partition_parser = commands.add_parser("partition-snippets", help="Move snippets to a hash-partitioned table (requires alembic upgrade head)")
+    partition_parser.add_argument("--partitions", type=int, default=16, help="Hash partitions by author_id")
+    partition_parser.add_argument("--split-public", action="store_true",
+                                  help="Split public and private snippets first, hash-partitioning each side")
+    partition_parser.add_argument("--batch-size", type=int, default=10000)
+    partition_parser.set_defaults(handler=run_partition_snippets)
+
+    return parser
+
+
+if __name__ == '__main__':
+    arguments = build_parser().parse_args()
+    sys.exit(asyncio.run(arguments.handler(arguments)))
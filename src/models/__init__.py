@@ -1,12 +1,20 @@
 from .base import Base
+from .code_blob import CodeBlob
+from .revision import SnippetRevision
 from .snippet import Snippet
+from .snippet_uuid import SnippetUuid
 from .user import User
+from .user_snippet_count import UserSnippetCount
 
 
 _all__ = [
     "Base",
+    "CodeBlob",
     "Snippet",
+    "SnippetRevision",
+    "SnippetUuid",
     "User",
+    "UserSnippetCount",
 ]
 
 
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, LargeBinary
+
+from core.compression import decompress_text
+from .base import Base
+
+
+class CodeBlob(Base):
+    __tablename__ = "code_blobs"
+
+    hash = Column(String(64), primary_key=True)
+    codec = Column(String(16), nullable=False)
+    size = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+
+    @property
+    def text(self) -> str:
+        return decompress_text(self.data, self.codec)
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, LargeBinary, DateTime, func
+from sqlalchemy.dialects.postgresql import UUID
+
+from .base import Base
+
+
+class SnippetRevision(Base):
+    __tablename__ = "snippet_revisions"
+
+    # snippet_uuids ведётся триггерами на snippets и держит uuid уникальным и при партиционировании
+    snippet_uuid = Column(UUID(as_uuid=True),
+                          ForeignKey("snippet_uuids.uuid", ondelete="CASCADE", deferrable=True, initially="DEFERRED"),
+                          primary_key=True)
+    number = Column(Integer, primary_key=True)
+    title = Column(String)
+    is_public = Column(Boolean)
+    # Опорная ревизия хранит код целиком, остальные - дельту к предыдущей
+    is_keyframe = Column(Boolean, nullable=False)
+    codec = Column(String(16), nullable=False)
+    payload = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
 from sqlalchemy.orm import relationship
 from .base import Base
 from sqlalchemy.dialects.postgresql import UUID
@@ -10,8 +10,14 @@ class Snippet(Base):
 
     uuid = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, unique=True)
     title = Column(String, index=True)
-    code = Column(Text, nullable=False)
-    author_id = Column(Integer, ForeignKey("users.id"))
+    code_hash = Column(String(64), ForeignKey("code_blobs.hash"), nullable=False, index=True)
+    author_id = Column(Integer, ForeignKey("users.id"), index=True)
     is_public = Column(Boolean, default=True)
 
     author = relationship("User", back_populates="snippets")
+    # Тело кода грузится только явным joinedload там, где оно отдаётся клиенту
+    code_blob = relationship("CodeBlob", lazy="raise")
+
+    @property
+    def code(self) -> str:
+        return self.code_blob.text
@@ -0,0 +1,11 @@
+from sqlalchemy import Column
+from sqlalchemy.dialects.postgresql import UUID
+
+from .base import Base
+
+
+# Уникальные uuid сниппетов; ведутся триггерами на snippets, на них ссылаются ревизии
+class SnippetUuid(Base):
+    __tablename__ = "snippet_uuids"
+
+    uuid = Column(UUID(as_uuid=True), primary_key=True)
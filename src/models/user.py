@@ -13,3 +13,13 @@ class User(Base):
     salt = Column(String(1024), nullable=False, unique=True, index=True)
 
     snippets = relationship("Snippet", back_populates="author")
+    # Грузится вместе с пользователем в get_current_user, чтобы квоты проверялись без COUNT(*)
+    snippet_counts = relationship("UserSnippetCount", uselist=False, lazy="raise", viewonly=True)
+
+    @property
+    def snippet_count(self) -> int:
+        return self.snippet_counts.total if self.snippet_counts else 0
+
+    @property
+    def public_snippet_count(self) -> int:
+        return self.snippet_counts.public if self.snippet_counts else 0
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, ForeignKey
+
+from .base import Base
+
+
+# Счётчики сниппетов пользователя; ведутся триггерами на snippets, приложение их только читает
+class UserSnippetCount(Base):
+    __tablename__ = "user_snippet_counts"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    public = Column(Integer, nullable=False, default=0)
@@ -1,9 +1,14 @@
-from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from core.config import settings
 
 
 class SnippetCreate(BaseModel):
-    title: str
-    code: str
+    title: str = Field(max_length=settings.snippet_title_max_length)
+    code: str = Field(max_length=settings.snippet_code_max_length)
     is_public: bool = True
 
 
@@ -15,6 +20,12 @@ class SnippetResponse(BaseModel):
     is_public: bool = True
 
 
+# Ответ get_snippet: при format=html добавляются язык и разметка с подсветкой
+class SnippetHighlightResponse(SnippetResponse):
+    language: Optional[str] = None
+    html: Optional[str] = None
+
+
 class SnippetDisplay(BaseModel):
     uuid: str
     title: str
@@ -22,3 +33,37 @@ class SnippetDisplay(BaseModel):
     author_name: str
     is_public: bool = True
     share_link: str
+
+
+class SnippetImportReport(BaseModel):
+    processed: int = 0
+    imported: int = 0
+    skipped: int = 0
+    failed: int = 0
+    rows_per_second: float = 0.0
+    errors: list[dict] = []
+
+
+class SnippetRevisionInfo(BaseModel):
+    number: int
+    title: Optional[str] = None
+    is_public: Optional[bool] = None
+    is_keyframe: bool
+    created_at: datetime
+    stored_bytes: int
+
+
+class SnippetRevisionResponse(BaseModel):
+    number: int
+    title: Optional[str] = None
+    code: str
+    is_public: Optional[bool] = None
+    created_at: datetime
+
+
+class SnippetCodeUploadResponse(BaseModel):
+    uuid: str
+    title: str
+    code_hash: str
+    size: int
+    is_public: bool = True
@@ -19,3 +19,9 @@ class UserResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class UserProfileResponse(UserResponse):
+    snippet_count: int
+    public_snippet_count: int
+    snippet_quota: int
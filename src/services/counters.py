@@ -0,0 +1,37 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Пересчёт по snippets с исправлением только разошедшихся строк user_snippet_counts
+RECONCILE_SQL = text("""
+    WITH actual AS (
+        SELECT author_id AS user_id, count(*) AS total, count(*) FILTER (WHERE is_public) AS public
+        FROM snippets
+        WHERE author_id IS NOT NULL
+        GROUP BY author_id
+    ), expected AS (
+        SELECT COALESCE(a.user_id, c.user_id) AS user_id,
+               COALESCE(a.total, 0) AS total, COALESCE(a.public, 0) AS public
+        FROM actual a
+        FULL JOIN user_snippet_counts c ON c.user_id = a.user_id
+    ), fixed AS (
+        INSERT INTO user_snippet_counts (user_id, total, public)
+        SELECT user_id, total, public FROM expected
+        ORDER BY user_id
+        ON CONFLICT (user_id) DO UPDATE
+        SET total = EXCLUDED.total, public = EXCLUDED.public
+        WHERE (user_snippet_counts.total, user_snippet_counts.public)
+              IS DISTINCT FROM (EXCLUDED.total, EXCLUDED.public)
+        RETURNING user_id
+    )
+    SELECT count(*) FROM fixed
+""")
+
+
+# Исправление расхождений счётчиков сниппетов; возвращает число исправленных пользователей.
+# На время пересчёта запись в snippets блокируется: иначе триггер параллельной вставки
+# может прибавить к уже устаревшему значению
+async def reconcile_snippet_counts(db: AsyncSession) -> int:
+    await db.execute(text("LOCK TABLE snippets IN SHARE MODE"))
+    fixed = (await db.execute(RECONCILE_SQL)).scalar_one()
+    await db.commit()
+    return fixed
@@ -0,0 +1,143 @@
+import base64
+import io
+import json
+import re
+import tarfile
+import time
+import uuid
+import zipfile
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import select, true
+
+from core.compression import decompress_text
+from db.db import async_session
+from models import CodeBlob, User
+from models.snippet import Snippet
+
+# Сколько строк asyncpg вытягивает из серверного курсора за один раз
+EXPORT_BATCH_SIZE = 500
+# Порог, после которого накопленные байты архива отдаются клиенту
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "tar": "application/x-tar",
+    "zip": "application/zip",
+}
+
+
+# Токен курсора - это uuid последнего отданного сниппета в urlsafe base64
+def encode_cursor(snippet_uuid: uuid.UUID) -> str:
+    return base64.urlsafe_b64encode(snippet_uuid.bytes).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> uuid.UUID:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return uuid.UUID(bytes=base64.urlsafe_b64decode(padded.encode("ascii")))
+
+
+# Имя файла в архиве: заголовок без опасных символов + uuid для уникальности.
+# Расширение из заголовка сохраняется (по нему выбирается лексер), иначе - default_extension
+def snippet_filename(title: Optional[str], snippet_uuid: uuid.UUID, default_extension: str = "txt") -> str:
+    safe_title = re.sub(r"[^\w.+-]+", "_", title or "").strip("._")
+    stem, dot, extension = safe_title.rpartition(".")
+    if not dot or not stem or not re.fullmatch(r"[A-Za-z0-9_+-]{1,16}", extension):
+        stem, extension = safe_title, default_extension
+    return f"{(stem or 'snippet')[:100]}_{snippet_uuid}.{extension}"
+
+
+def build_export_query(author_id: Optional[int], cursor: Optional[uuid.UUID]):
+    # Выбираем только нужные колонки, чтобы не наполнять identity map сессии
+    query = (
+        select(
+            Snippet.uuid, Snippet.title, Snippet.is_public, User.name.label("author_name"),
+            CodeBlob.codec, CodeBlob.data,
+        )
+        .join(User, Snippet.author_id == User.id)
+        .join(CodeBlob, Snippet.code_hash == CodeBlob.hash)
+        .order_by(Snippet.uuid)
+    )
+    if author_id is None:
+        query = query.where(Snippet.is_public == true())
+    else:
+        query = query.where(Snippet.author_id == author_id)
+    if cursor is not None:
+        query = query.where(Snippet.uuid > cursor)
+    return query.execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+
+# Построчно читаем сниппеты через серверный курсор asyncpg
+async def iter_export_rows(author_id: Optional[int], cursor: Optional[uuid.UUID]) -> AsyncIterator:
+    # Своя сессия: сессия из зависимости закрывается до начала отдачи тела ответа
+    async with async_session() as session:
+        result = await session.stream(build_export_query(author_id, cursor))
+        async for row in result:
+            yield row
+
+
+async def export_ndjson(author_id: Optional[int], cursor: Optional[uuid.UUID]) -> AsyncIterator[bytes]:
+    async for row in iter_export_rows(author_id, cursor):
+        line = {
+            "uuid": str(row.uuid),
+            "title": row.title,
+            "code": decompress_text(row.data, row.codec),
+            "author_name": row.author_name,
+            "is_public": row.is_public,
+            "cursor": encode_cursor(row.uuid),
+        }
+        yield json.dumps(line, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+# Файловый объект без seek/tell, из которого периодически забираются записанные байты
+class _ChunkBuffer:
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        self.size = 0
+        return data
+
+
+async def export_tar(author_id: Optional[int], cursor: Optional[uuid.UUID]) -> AsyncIterator[bytes]:
+    buffer = _ChunkBuffer()
+    # Потоковый режим "w|" пишет архив последовательно, без seek
+    with tarfile.open(fileobj=buffer, mode="w|") as archive:
+        async for row in iter_export_rows(author_id, cursor):
+            data = decompress_text(row.data, row.codec).encode("utf-8")
+            info = tarfile.TarInfo(snippet_filename(row.title, row.uuid))
+            info.size = len(data)
+            info.mtime = int(time.time())
+            archive.addfile(info, io.BytesIO(data))
+            if buffer.size >= EXPORT_CHUNK_SIZE:
+                yield buffer.drain()
+    yield buffer.drain()
+
+
+async def export_zip(author_id: Optional[int], cursor: Optional[uuid.UUID]) -> AsyncIterator[bytes]:
+    buffer = _ChunkBuffer()
+    # zipfile сам переходит на data descriptor для потока без tell/seek
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        async for row in iter_export_rows(author_id, cursor):
+            archive.writestr(snippet_filename(row.title, row.uuid), decompress_text(row.data, row.codec))
+            if buffer.size >= EXPORT_CHUNK_SIZE:
+                yield buffer.drain()
+    yield buffer.drain()
+
+
+EXPORTERS = {
+    "ndjson": export_ndjson,
+    "tar": export_tar,
+    "zip": export_zip,
+}
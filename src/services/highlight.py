@@ -0,0 +1,245 @@
+import asyncio
+import fnmatch
+import hashlib
+import importlib.util
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Optional
+
+from core.config import settings
+
+logger = logging.getLogger("my_app")
+
+_executor: Optional[ProcessPoolExecutor] = None
+_memory_cache: "OrderedDict[str, dict]" = OrderedDict()
+_memory_cache_bytes = 0
+_in_flight: dict[str, asyncio.Future] = {}
+_written_since_eviction = 0
+
+# Вытеснение из дискового кэша проверяется после записи каждой 1/16 его лимита
+EVICTION_CHECK_FRACTION = 16
+
+
+# Pygments - необязательная зависимость; без неё format=html недоступен.
+# Сам модуль импортируется только в процессах пула рендера
+@lru_cache(maxsize=None)
+def highlight_available() -> bool:
+    return importlib.util.find_spec("pygments") is not None
+
+
+# Список стилей собирается один раз: get_all_styles() каждый раз заново ищет плагины через entry points
+@lru_cache(maxsize=None)
+def _style_names() -> frozenset[str]:
+    from pygments.styles import get_all_styles
+    return frozenset(get_all_styles())
+
+
+def is_known_style(style: str) -> bool:
+    return style in _style_names()
+
+
+# Шаблоны имён файлов всех лексеров из таблицы pygments, без импорта модулей самих лексеров
+@lru_cache(maxsize=None)
+def _lexer_filename_patterns() -> tuple[tuple[str, tuple[str, ...]], ...]:
+    from pygments.lexers import find_plugin_lexers
+    from pygments.lexers._mapping import LEXERS
+
+    patterns = [(name, tuple(filenames)) for _, name, _, filenames, _ in LEXERS.values()]
+    patterns.extend((cls.name, tuple(cls.filenames)) for cls in find_plugin_lexers())
+    return tuple(patterns)
+
+
+# Часть ключа кэша, от которой зависит выбор лексера в render_html: лексеры, подходящие по имени файла.
+# Если подходящих нет, язык угадывается по самому коду, который уже учтён в code_hash
+@lru_cache(maxsize=4096)
+def lexer_key(title: Optional[str]) -> str:
+    if not title or "." not in title:
+        return ""
+    filename = os.path.basename(title)
+    return ",".join(sorted({
+        name for name, patterns in _lexer_filename_patterns()
+        if any(fnmatch.fnmatchcase(filename, pattern) for pattern in patterns)
+    }))
+
+
+# Выполняется в дочернем процессе: определение языка и рендер в HTML
+def render_html(code: str, title: Optional[str], style: str) -> dict:
+    from pygments import highlight
+    from pygments.formatters import HtmlFormatter
+    from pygments.lexers import TextLexer, get_lexer_for_filename, guess_lexer
+    from pygments.util import ClassNotFound
+
+    lexer = None
+    if title and "." in title:
+        try:
+            lexer = get_lexer_for_filename(title, code)
+        except ClassNotFound:
+            pass
+    if lexer is None:
+        try:
+            lexer = guess_lexer(code)
+        except ClassNotFound:
+            lexer = TextLexer()
+    # Стили встраиваются в разметку, чтобы клиенту не нужен был отдельный CSS
+    html = highlight(code, lexer, HtmlFormatter(style=style, noclasses=True))
+    return {"language": lexer.name, "html": html}
+
+
+def cache_key(code_hash: str, style: str, title: Optional[str] = None) -> str:
+    return hashlib.sha256(f"{code_hash}:{style}:{lexer_key(title)}".encode("utf-8")).hexdigest()
+
+
+def _cache_path(key: str) -> str:
+    return os.path.join(settings.highlight_cache_dir, key[:2], f"{key}.json")
+
+
+def _remember(key: str, value: dict):
+    global _memory_cache_bytes
+    if key in _memory_cache:
+        return
+    _memory_cache[key] = value
+    _memory_cache_bytes += len(value["html"])
+    while _memory_cache_bytes > settings.highlight_memory_cache_bytes and _memory_cache:
+        _, evicted = _memory_cache.popitem(last=False)
+        _memory_cache_bytes -= len(evicted["html"])
+
+
+# Дисковый кэш общий для всех воркеров; время изменения файла служит отметкой LRU
+def _read_disk_cache(key: str) -> Optional[dict]:
+    path = _cache_path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            value = json.load(file)
+        os.utime(path)
+        return value
+    except (OSError, ValueError):
+        return None
+
+
+def _write_disk_cache(key: str, value: dict):
+    global _written_since_eviction
+    path = _cache_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(value, file, ensure_ascii=False)
+    os.replace(temp_path, path)
+    # Полный обход каталога дорог, поэтому не на каждую запись, а по накоплении записанного объёма
+    _written_since_eviction += os.path.getsize(path)
+    if _written_since_eviction >= settings.highlight_cache_max_bytes // EVICTION_CHECK_FRACTION:
+        _written_since_eviction = 0
+        _evict_disk_cache()
+
+
+# Удаляем самые давно использованные записи, пока кэш больше лимита
+def _evict_disk_cache():
+    entries, total = [], 0
+    for root, _, files in os.walk(settings.highlight_cache_dir):
+        for name in files:
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+    if total <= settings.highlight_cache_max_bytes:
+        return
+    for _, size, path in sorted(entries):
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        if total <= settings.highlight_cache_max_bytes:
+            break
+
+
+# Межпроцессная блокировка через lock-файл, чтобы тело рендерил один воркер
+def _acquire_render_lock(key: str) -> bool:
+    path = _cache_path(key) + ".lock"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        if time.time() - os.stat(path).st_mtime > settings.highlight_lock_timeout:
+            os.remove(path)
+    except OSError:
+        pass
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        return False
+
+
+def _release_render_lock(key: str):
+    try:
+        os.remove(_cache_path(key) + ".lock")
+    except OSError:
+        pass
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # Воркер к этому моменту уже запустил потоки (asyncio.to_thread), а fork многопоточного процесса
+        # может зависнуть на чужой блокировке - процессы рендера порождает чистый forkserver
+        _executor = ProcessPoolExecutor(max_workers=settings.highlight_workers,
+                                        mp_context=multiprocessing.get_context("forkserver"))
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def _render_shared(key: str, code: str, title: Optional[str], style: str) -> dict:
+    loop = asyncio.get_running_loop()
+    value = await asyncio.to_thread(_read_disk_cache, key)
+    if value is not None:
+        return value
+
+    locked = await asyncio.to_thread(_acquire_render_lock, key)
+    if not locked:
+        # Тело уже рендерит другой воркер - ждём его результат
+        deadline = loop.time() + settings.highlight_lock_timeout
+        while loop.time() < deadline:
+            await asyncio.sleep(0.05)
+            value = await asyncio.to_thread(_read_disk_cache, key)
+            if value is not None:
+                return value
+    try:
+        value = await loop.run_in_executor(get_executor(), render_html, code, title, style)
+        await asyncio.to_thread(_write_disk_cache, key, value)
+        return value
+    finally:
+        if locked:
+            await asyncio.to_thread(_release_render_lock, key)
+
+
+# HTML с подсветкой, закэшированный по хэшу тела кода, стилю и лексерам, подходящим по заголовку
+async def highlight_snippet(code_hash: str, code: str, title: Optional[str], style: str) -> dict:
+    key = cache_key(code_hash, style, title)
+    if key in _memory_cache:
+        _memory_cache.move_to_end(key)
+        return _memory_cache[key]
+
+    # Одновременные запросы одного тела внутри воркера ждут общий рендер
+    future = _in_flight.get(key)
+    if future is None:
+        future = asyncio.ensure_future(_render_shared(key, code, title, style))
+        _in_flight[key] = future
+        future.add_done_callback(lambda _: _in_flight.pop(key, None))
+    value = await asyncio.shield(future)
+    _remember(key, value)
+    return value
@@ -0,0 +1,238 @@
+import codecs
+import csv
+import json
+import logging
+import time
+import uuid
+from typing import AsyncIterator, Callable, Literal, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.compression import compress, content_hash
+from schemas.snippet import SnippetCreate, SnippetImportReport
+
+logger = logging.getLogger("my_app")
+
+ImportFormat = Literal["ndjson", "csv"]
+
+# Размер пачки, которая за один COPY попадает в промежуточную таблицу
+IMPORT_BATCH_SIZE = 5000
+# Больше ошибок в отчёт не пишем, чтобы он не разрастался на битых файлах
+IMPORT_MAX_REPORTED_ERRORS = 1000
+IMPORT_STAGING_TABLE = "snippets_import"
+IMPORT_COLUMNS = ("uuid", "title", "code_hash", "author_id", "is_public")
+IMPORT_BLOB_STAGING_TABLE = "code_blobs_import"
+IMPORT_BLOB_COLUMNS = ("hash", "codec", "size", "data")
+
+ENSURE_SNIPPET_COUNT_SQL = text(
+    "INSERT INTO user_snippet_counts (user_id, total, public) VALUES (:author_id, 0, 0) ON CONFLICT (user_id) DO NOTHING"
+)
+LOCK_SNIPPET_COUNT_SQL = text("SELECT total FROM user_snippet_counts WHERE user_id = :author_id FOR UPDATE")
+
+
+# Разбиваем поток байтов на строки, не собирая весь файл в памяти
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    tail = ""
+    async for chunk in chunks:
+        tail += decoder.decode(chunk)
+        *lines, tail = tail.split("\n")
+        for line in lines:
+            yield line
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+# Номер строки и сырые данные каждой записи NDJSON
+async def iter_ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, object]]:
+    line_no = 0
+    async for line in iter_lines(chunks):
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except json.JSONDecodeError as ex:
+            yield line_no, ex
+
+
+# CSV с заголовком; поле code может содержать переводы строк внутри кавычек
+async def iter_csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, object]]:
+    header: Optional[list[str]] = None
+    pending: list[str] = []
+    record_line = 0
+    line_no = 0
+    async for line in iter_lines(chunks):
+        line_no += 1
+        if not pending:
+            record_line = line_no
+        pending.append(line)
+        # Запись закончилась, если все кавычки в ней закрыты (экранирование - удвоенные кавычки)
+        if sum(part.count('"') for part in pending) % 2:
+            continue
+        raw = "\n".join(pending).rstrip("\r")
+        pending.clear()
+        if not raw.strip():
+            continue
+        row = next(csv.reader([raw]))
+        if header is None:
+            header = row
+            continue
+        if len(row) != len(header):
+            yield record_line, ValueError(f"Expected {len(header)} columns, got {len(row)}")
+            continue
+        yield record_line, dict(zip(header, row))
+    if pending:
+        yield record_line, ValueError("Unterminated quoted field")
+
+
+RECORD_PARSERS = {
+    "ndjson": iter_ndjson_records,
+    "csv": iter_csv_records,
+}
+
+
+async def _copy_to_staging(db: AsyncSession, table: str, staging_table: str,
+                           columns: tuple[str, ...], records: list[tuple]):
+    # COPY идёт в промежуточную таблицу, а в основную строки попадают одним INSERT ... SELECT
+    await db.execute(text(f"CREATE TEMP TABLE {staging_table} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP"))
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(staging_table, records=records, columns=columns)
+
+
+async def _copy_batch(db: AsyncSession, blobs: dict[str, tuple], records: list[tuple]) -> int:
+    # Сначала тела кода, чтобы внешний ключ snippets.code_hash был удовлетворён
+    await _copy_to_staging(db, "code_blobs", IMPORT_BLOB_STAGING_TABLE, IMPORT_BLOB_COLUMNS, list(blobs.values()))
+    blob_columns = ", ".join(IMPORT_BLOB_COLUMNS)
+    await db.execute(text(
+        f"INSERT INTO code_blobs ({blob_columns}) SELECT {blob_columns} FROM {IMPORT_BLOB_STAGING_TABLE} "
+        f"ON CONFLICT (hash) DO NOTHING"
+    ))
+    await _copy_to_staging(db, "snippets", IMPORT_STAGING_TABLE, IMPORT_COLUMNS, records)
+    # Без цели конфликта: у партиционированной snippets нет уникального индекса только по uuid.
+    # Каждый вставленный сниппет сразу получает опорную ревизию 1, как при обычном создании;
+    # её содержимое совпадает со сжатым блобом, поэтому код повторно не сжимается
+    columns = ", ".join(IMPORT_COLUMNS)
+    result = await db.execute(text(f"""
+        WITH inserted AS (
+            INSERT INTO snippets ({columns}) SELECT {columns} FROM {IMPORT_STAGING_TABLE}
+            ON CONFLICT DO NOTHING
+            RETURNING uuid, title, code_hash, is_public
+        )
+        INSERT INTO snippet_revisions (snippet_uuid, number, title, is_public, is_keyframe, codec, payload)
+        SELECT inserted.uuid, 1, inserted.title, inserted.is_public, true, code_blobs.codec, code_blobs.data
+        FROM inserted JOIN code_blobs ON code_blobs.hash = inserted.code_hash
+    """))
+    await db.commit()
+    return result.rowcount
+
+
+# Строка счётчика блокируется до коммита пачки, чтобы параллельные импорты одного автора не превысили квоту вместе
+async def _lock_snippet_count(db: AsyncSession, author_id: int) -> int:
+    await db.execute(ENSURE_SNIPPET_COUNT_SQL, {"author_id": author_id})
+    return (await db.execute(LOCK_SNIPPET_COUNT_SQL, {"author_id": author_id})).scalar_one()
+
+
+# Импорт сниппетов из потока NDJSON/CSV от имени пользователя author_id.
+# С quota у автора не станет больше quota сниппетов: лишние строки попадают в отчёт как ошибки
+async def import_snippets(
+        db: AsyncSession,
+        chunks: AsyncIterator[bytes],
+        author_id: int,
+        import_format: ImportFormat = "ndjson",
+        batch_size: int = IMPORT_BATCH_SIZE,
+        on_progress: Optional[Callable[[SnippetImportReport], None]] = None,
+        quota: Optional[int] = None,
+) -> SnippetImportReport:
+    report = SnippetImportReport()
+    batch: list[tuple] = []
+    batch_lines: list[int] = []
+    blobs: dict[str, tuple] = {}
+    started = time.perf_counter()
+    quota_error = f"Snippet quota exceeded ({quota})"
+    # Оценка остатка квоты между пачками; точная проверка - под блокировкой в flush
+    quota_left = None
+
+    def fail(line_no: int, message: str):
+        report.failed += 1
+        if len(report.errors) < IMPORT_MAX_REPORTED_ERRORS:
+            report.errors.append({"line": line_no, "error": message})
+
+    async def flush():
+        nonlocal quota_left
+        if quota:
+            allowed = max(quota - await _lock_snippet_count(db, author_id), 0)
+            for line_no in batch_lines[allowed:]:
+                fail(line_no, quota_error)
+            del batch[allowed:]
+            referenced = {record[2] for record in batch}
+            for code_hash in [code_hash for code_hash in blobs if code_hash not in referenced]:
+                del blobs[code_hash]
+        if batch:
+            imported = await _copy_batch(db, blobs, batch)
+        else:
+            imported = 0
+            await db.commit()
+        if quota:
+            quota_left = allowed - imported
+        report.imported += imported
+        report.skipped += len(batch) - imported
+        report.rows_per_second = round(report.processed / (time.perf_counter() - started), 1)
+        batch.clear()
+        batch_lines.clear()
+        blobs.clear()
+        logger.info(f"Импорт сниппетов: обработано {report.processed}, загружено {report.imported}")
+        if on_progress is not None:
+            on_progress(report)
+
+    async for line_no, record in RECORD_PARSERS[import_format](chunks):
+        report.processed += 1
+        try:
+            if isinstance(record, Exception):
+                raise record
+            snippet = SnippetCreate.model_validate(record)
+        except ValidationError as ex:
+            fail(line_no, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in ex.errors()))
+            continue
+        except ValueError as ex:
+            fail(line_no, str(ex))
+            continue
+        # Квота уже исчерпана прошлыми пачками - строку даже не сжимаем
+        if quota_left is not None and len(batch) >= quota_left:
+            fail(line_no, quota_error)
+            continue
+        data = snippet.code.encode("utf-8")
+        code_hash = content_hash(data)
+        if code_hash not in blobs:
+            codec, packed = compress(data)
+            blobs[code_hash] = (code_hash, codec, len(data), packed)
+        batch.append((uuid.uuid4(), snippet.title, code_hash, author_id, snippet.is_public))
+        batch_lines.append(line_no)
+        if len(batch) >= batch_size:
+            await flush()
+
+    if batch:
+        await flush()
+    report.rows_per_second = round(report.processed / max(time.perf_counter() - started, 1e-9), 1)
+    return report
+
+
+# Чтение файла кусками для CLI
+async def iter_file_chunks(path: str, chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+    with open(path, "rb") as file:
+        while chunk := file.read(chunk_size):
+            yield chunk
+
+
+def guess_import_format(filename: Optional[str]) -> ImportFormat:
+    return "csv" if filename and filename.lower().endswith(".csv") else "ndjson"
+
+
+# Формат тела HTTP-запроса по Content-Type; всё, кроме CSV, разбирается как NDJSON
+def import_format_for_content_type(content_type: Optional[str]) -> ImportFormat:
+    media_type = (content_type or "").split(";", 1)[0].strip().lower()
+    return "csv" if media_type in ("text/csv", "application/csv") else "ndjson"
@@ -0,0 +1,185 @@
+import logging
+from typing import Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+logger = logging.getLogger("my_app")
+
+# Сколько строк переносится в новую таблицу за одну транзакцию
+PARTITION_BATCH_SIZE = 10000
+COLUMNS = "uuid, title, code_hash, author_id, is_public"
+
+IS_PARTITIONED_SQL = text(
+    "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'snippets'::regclass)"
+)
+# Старая таблица удаляется при подмене, поэтому на неё не должно быть внешних ключей:
+# ревизии ссылаются на snippet_uuids начиная с миграции 9d4f6a2c8b15
+SNIPPETS_REFERENCES_SQL = text(
+    "SELECT conrelid::regclass::text FROM pg_constraint WHERE contype = 'f' AND confrelid = 'snippets'::regclass"
+)
+SNIPPET_UUIDS_EXISTS_SQL = text("SELECT to_regclass('snippet_uuids') IS NOT NULL")
+
+# Пока идёт копирование, все изменения старой таблицы повторяются в новой
+MIRROR_FUNCTION_SQL = f"""
+    CREATE OR REPLACE FUNCTION snippets_mirror() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            DELETE FROM snippets_partitioned WHERE uuid = OLD.uuid;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO snippets_partitioned ({COLUMNS})
+            VALUES (NEW.uuid, NEW.title, NEW.code_hash, NEW.author_id, COALESCE(NEW.is_public, true))
+            ON CONFLICT DO NOTHING;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+# Следующая пачка по uuid; возвращает uuid последней строки пачки и её размер
+BACKFILL_BATCH_SQL = text(f"""
+    WITH batch AS (
+        SELECT {COLUMNS} FROM snippets
+        WHERE (CAST(:last_uuid AS UUID) IS NULL OR uuid > CAST(:last_uuid AS UUID))
+        ORDER BY uuid LIMIT :limit
+    ), moved AS (
+        INSERT INTO snippets_partitioned ({COLUMNS})
+        SELECT uuid, title, code_hash, author_id, COALESCE(is_public, true) FROM batch
+        ON CONFLICT DO NOTHING
+    )
+    SELECT max(uuid::text), count(*) FROM batch
+""")
+
+
+async def is_partitioned(connection: AsyncConnection) -> bool:
+    return (await connection.execute(IS_PARTITIONED_SQL)).scalar()
+
+
+async def _execute(connection: AsyncConnection, *statements: str):
+    for statement in statements:
+        await connection.execute(text(statement))
+
+
+# Партиции по HASH (author_id); с split_public публичные и личные сниппеты сначала разделяются
+# по LIST (is_public), и каждая из двух частей так же делится по автору
+async def _create_partitioned_table(connection: AsyncConnection, partitions: int, split_public: bool):
+    # Ключ партиционирования обязан входить в первичный ключ
+    primary_key = "uuid, is_public, author_id" if split_public else "uuid, author_id"
+    partition_by = "LIST (is_public)" if split_public else "HASH (author_id)"
+    await _execute(connection, "DROP TABLE IF EXISTS snippets_partitioned", f"""
+        CREATE TABLE snippets_partitioned (
+            uuid UUID NOT NULL,
+            title VARCHAR,
+            code_hash VARCHAR(64) NOT NULL REFERENCES code_blobs (hash),
+            author_id INTEGER NOT NULL REFERENCES users (id),
+            is_public BOOLEAN NOT NULL DEFAULT true,
+            CONSTRAINT snippets_partitioned_pkey PRIMARY KEY ({primary_key})
+        ) PARTITION BY {partition_by}
+    """)
+    hashed_parents = ["snippets_partitioned"]
+    if split_public:
+        await _execute(
+            connection,
+            "CREATE TABLE snippets_public PARTITION OF snippets_partitioned "
+            "FOR VALUES IN (true) PARTITION BY HASH (author_id)",
+            "CREATE TABLE snippets_private PARTITION OF snippets_partitioned "
+            "FOR VALUES IN (false) PARTITION BY HASH (author_id)",
+        )
+        hashed_parents = ["snippets_public", "snippets_private"]
+    for parent in hashed_parents:
+        for remainder in range(partitions):
+            await _execute(connection, f"CREATE TABLE {parent}_p{remainder} PARTITION OF {parent} "
+                                       f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})")
+    await _execute(
+        connection,
+        "CREATE INDEX ix_snippets_partitioned_title ON snippets_partitioned (title)",
+        "CREATE INDEX ix_snippets_partitioned_code_hash ON snippets_partitioned (code_hash)",
+        "CREATE INDEX ix_snippets_partitioned_uuid ON snippets_partitioned (uuid)",
+        "CREATE INDEX ix_snippets_partitioned_author_id ON snippets_partitioned (author_id)",
+    )
+
+
+async def _swap(connection: AsyncConnection):
+    await _execute(connection, "LOCK TABLE snippets IN ACCESS EXCLUSIVE MODE")
+    # Сверка под блокировкой: убираем устаревшие версии строк, дописываем пропущенные
+    await _execute(connection, """
+        DELETE FROM snippets_partitioned n WHERE NOT EXISTS (
+            SELECT 1 FROM snippets o
+            WHERE o.uuid = n.uuid AND o.author_id = n.author_id AND COALESCE(o.is_public, true) = n.is_public
+              AND o.code_hash = n.code_hash AND o.title IS NOT DISTINCT FROM n.title
+        )
+    """, f"""
+        INSERT INTO snippets_partitioned ({COLUMNS})
+        SELECT uuid, title, code_hash, author_id, COALESCE(is_public, true) FROM snippets
+        ON CONFLICT DO NOTHING
+    """)
+    # Триггеры старой таблицы (счётчики, snippet_uuids) переносятся на новую как есть
+    triggers = (await connection.execute(text(
+        "SELECT pg_get_triggerdef(oid) FROM pg_trigger "
+        "WHERE tgrelid = 'snippets'::regclass AND NOT tgisinternal AND tgname <> 'snippets_mirror'"
+    ))).scalars().all()
+    await _execute(
+        connection,
+        "DROP TRIGGER snippets_mirror ON snippets",
+        "DROP FUNCTION snippets_mirror()",
+        "ALTER TABLE snippets RENAME TO snippets_unpartitioned",
+        "ALTER TABLE snippets_partitioned RENAME TO snippets",
+        "DROP TABLE snippets_unpartitioned",
+        "ALTER INDEX snippets_partitioned_pkey RENAME TO snippets_pkey",
+        "ALTER INDEX ix_snippets_partitioned_title RENAME TO ix_snippets_title",
+        "ALTER INDEX ix_snippets_partitioned_code_hash RENAME TO ix_snippets_code_hash",
+        "ALTER INDEX ix_snippets_partitioned_uuid RENAME TO ix_snippets_uuid",
+        "ALTER INDEX ix_snippets_partitioned_author_id RENAME TO ix_snippets_author_id",
+        *triggers,
+    )
+
+
+# Перевод snippets на партиционированную таблицу без долгой блокировки: триггер повторяет запись
+# в новой таблице, существующие строки копируются пачками с коммитом каждой, затем таблицы
+# меняются местами под короткой эксклюзивной блокировкой. Уже партиционированную таблицу не трогает,
+# прерванный запуск можно повторить. Нужна база на последней миграции (alembic upgrade head).
+# Возвращает число перенесённых строк или None
+async def partition_snippets(engine: AsyncEngine, partitions: int = 16, split_public: bool = False,
+                             batch_size: int = PARTITION_BATCH_SIZE,
+                             on_progress: Optional[Callable[[int], None]] = None) -> Optional[int]:
+    async with engine.connect() as connection:
+        if await is_partitioned(connection):
+            return None
+        referencing = (await connection.execute(SNIPPETS_REFERENCES_SQL)).scalars().all()
+        if referencing or not (await connection.execute(SNIPPET_UUIDS_EXISTS_SQL)).scalar():
+            raise RuntimeError("snippets is still referenced by foreign keys "
+                               f"({', '.join(referencing) or 'snippet_uuids is missing'}); run 'alembic upgrade head' first")
+        null_authors = (await connection.execute(
+            text("SELECT count(*) FROM snippets WHERE author_id IS NULL")
+        )).scalar()
+        if null_authors:
+            raise RuntimeError(f"{null_authors} snippets have no author_id; assign or delete them before partitioning")
+
+        await _create_partitioned_table(connection, partitions, split_public)
+        await _execute(
+            connection,
+            MIRROR_FUNCTION_SQL,
+            "DROP TRIGGER IF EXISTS snippets_mirror ON snippets",
+            "CREATE TRIGGER snippets_mirror AFTER INSERT OR UPDATE OR DELETE ON snippets "
+            "FOR EACH ROW EXECUTE FUNCTION snippets_mirror()",
+        )
+        await connection.commit()
+
+        # Каждая пачка коммитится отдельно и не держит блокировок на всю таблицу
+        moved, last_uuid = 0, None
+        while True:
+            last_uuid, count = (await connection.execute(
+                BACKFILL_BATCH_SQL, {"last_uuid": last_uuid, "limit": batch_size}
+            )).one()
+            await connection.commit()
+            if last_uuid is None:
+                break
+            moved += count
+            if on_progress is not None:
+                on_progress(moved)
+
+        await _swap(connection)
+        await connection.commit()
+    logger.info(f"snippets partitioned into {partitions} hash partitions (split_public={split_public})")
+    return moved
@@ -0,0 +1,159 @@
+import difflib
+import json
+from typing import Optional
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.compression import compress, decompress, decompress_text
+from core.config import settings
+from models import SnippetRevision
+from models.snippet import Snippet
+
+# Операции дельты: ["c", i1, i2] - скопировать строки предыдущей версии, ["i", text] - вставить текст
+OP_COPY = "c"
+OP_INSERT = "i"
+
+
+def make_delta(old: str, new: str) -> list:
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    ops = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old_lines, new_lines).get_opcodes():
+        if tag == "equal":
+            ops.append([OP_COPY, i1, i2])
+        elif j2 > j1:
+            ops.append([OP_INSERT, "".join(new_lines[j1:j2])])
+    return ops
+
+
+def apply_delta(old: str, ops: list) -> str:
+    old_lines = old.splitlines(keepends=True)
+    parts = []
+    for op in ops:
+        if op[0] == OP_COPY:
+            parts.extend(old_lines[op[1]:op[2]])
+        else:
+            parts.append(op[1])
+    return "".join(parts)
+
+
+def is_keyframe_number(number: int, interval: Optional[int] = None) -> bool:
+    return (number - 1) % (interval or settings.revision_keyframe_interval) == 0
+
+
+# Содержимое ревизии: весь код для опорной, дельта к предыдущей для остальных
+def encode_revision(number: int, code: str, previous_code: Optional[str],
+                    interval: Optional[int] = None) -> tuple[bool, str, bytes]:
+    is_keyframe = previous_code is None or is_keyframe_number(number, interval)
+    if is_keyframe:
+        raw = code.encode("utf-8")
+    else:
+        raw = json.dumps(make_delta(previous_code, code), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    codec, payload = compress(raw)
+    return is_keyframe, codec, payload
+
+
+# Восстановление кода по цепочке от опорной ревизии
+def decode_revisions(revisions: list) -> str:
+    code = ""
+    for revision in revisions:
+        raw = decompress(revision.payload, revision.codec).decode("utf-8")
+        code = raw if revision.is_keyframe else apply_delta(code, json.loads(raw))
+    return code
+
+
+async def last_revision_number(db: AsyncSession, snippet_uuid) -> int:
+    result = await db.execute(
+        select(func.coalesce(func.max(SnippetRevision.number), 0))
+        .where(SnippetRevision.snippet_uuid == snippet_uuid)
+    )
+    return result.scalar_one()
+
+
+def _build_revision(snippet_uuid, number: int, title: Optional[str], is_public: Optional[bool],
+                    code: str, previous_code: Optional[str]) -> SnippetRevision:
+    is_keyframe, codec, payload = encode_revision(number, code, previous_code)
+    return SnippetRevision(
+        snippet_uuid=snippet_uuid, number=number, title=title, is_public=is_public,
+        is_keyframe=is_keyframe, codec=codec, payload=payload,
+    )
+
+
+# Первая ревизия нового сниппета
+def add_initial_revision(db: AsyncSession, snippet: Snippet, code: str):
+    db.add(_build_revision(snippet.uuid, 1, snippet.title, snippet.is_public, code, None))
+
+
+# Ревизия после обновления; у сниппетов без истории сначала сохраняется прежняя версия.
+# Строка сниппета должна быть заблокирована вызывающим (SELECT ... FOR UPDATE): иначе параллельные
+# обновления получат один номер ревизии, а дельта посчитается не от той версии кода
+async def add_revision(db: AsyncSession, snippet: Snippet, code: str,
+                       previous_code: str, previous_title: Optional[str], previous_is_public: Optional[bool]):
+    number = await last_revision_number(db, snippet.uuid)
+    if number == 0:
+        number = 1
+        db.add(_build_revision(snippet.uuid, number, previous_title, previous_is_public, previous_code, None))
+    db.add(_build_revision(snippet.uuid, number + 1, snippet.title, snippet.is_public, code, previous_code))
+
+
+# Ревизия из уже сжатого тела (потоковая загрузка) по тем же правилам опорных ревизий и дельт:
+# опорная сохраняется без пересжатия, для остальных тело распаковывается ради дельты.
+# Как и для add_revision, строка сниппета должна быть заблокирована
+async def add_stored_revision(db: AsyncSession, snippet: Snippet, codec: str, payload: bytes,
+                              previous_blob, previous_title: Optional[str], previous_is_public: Optional[bool]):
+    number = await last_revision_number(db, snippet.uuid)
+    if number == 0:
+        number = 1
+        db.add(SnippetRevision(
+            snippet_uuid=snippet.uuid, number=number, title=previous_title, is_public=previous_is_public,
+            is_keyframe=True, codec=previous_blob.codec, payload=previous_blob.data,
+        ))
+    number += 1
+    if is_keyframe_number(number):
+        db.add(SnippetRevision(
+            snippet_uuid=snippet.uuid, number=number, title=snippet.title, is_public=snippet.is_public,
+            is_keyframe=True, codec=codec, payload=payload,
+        ))
+        return
+    db.add(_build_revision(snippet.uuid, number, snippet.title, snippet.is_public,
+                           decompress_text(payload, codec), previous_blob.text))
+
+
+async def list_revisions(db: AsyncSession, snippet_uuid) -> list:
+    result = await db.execute(
+        select(
+            SnippetRevision.number, SnippetRevision.title, SnippetRevision.is_public,
+            SnippetRevision.is_keyframe, SnippetRevision.created_at,
+            func.length(SnippetRevision.payload).label("stored_bytes"),
+        )
+        .where(SnippetRevision.snippet_uuid == snippet_uuid)
+        .order_by(SnippetRevision.number)
+    )
+    return result.all()
+
+
+# Чтение ревизии: не больше revision_keyframe_interval строк от ближайшей опорной
+async def get_revision(db: AsyncSession, snippet_uuid, number: int) -> Optional[tuple[SnippetRevision, str]]:
+    keyframe = (
+        select(func.max(SnippetRevision.number))
+        .where(
+            SnippetRevision.snippet_uuid == snippet_uuid,
+            SnippetRevision.is_keyframe.is_(True),
+            SnippetRevision.number <= number,
+        )
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        select(SnippetRevision)
+        .where(
+            SnippetRevision.snippet_uuid == snippet_uuid,
+            SnippetRevision.number >= keyframe,
+            SnippetRevision.number <= number,
+        )
+        .order_by(SnippetRevision.number)
+    )
+    revisions = result.scalars().all()
+    if not revisions or revisions[-1].number != number:
+        return None
+    return revisions[-1], decode_revisions(revisions)
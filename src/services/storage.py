@@ -0,0 +1,89 @@
+import codecs
+import hashlib
+from typing import AsyncIterator
+
+from fastapi import HTTPException
+from sqlalchemy import select, func, delete, exists
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from core.compression import StreamCompressor, compress, content_hash
+from core.config import settings
+from models import CodeBlob
+from models.snippet import Snippet
+
+
+# Запись уже сжатого блоба; одинаковые тела кода хранятся один раз
+async def store_blob(db: AsyncSession, blob_hash: str, codec: str, size: int, data: bytes) -> str:
+    await db.execute(
+        insert(CodeBlob)
+        .values(hash=blob_hash, codec=codec, size=size, data=data)
+        .on_conflict_do_nothing(index_elements=[CodeBlob.hash])
+    )
+    return blob_hash
+
+
+# Сохраняем тело кода и возвращаем его хэш для Snippet.code_hash
+async def store_code(db: AsyncSession, code: str) -> str:
+    data = code.encode("utf-8")
+    codec, packed = compress(data)
+    return await store_blob(db, content_hash(data), codec, len(data), packed)
+
+
+# Отчёт об экономии места: логический объём, после дедупликации и после сжатия
+async def storage_report(db: AsyncSession) -> dict:
+    snippets = (await db.execute(
+        select(func.count(), func.coalesce(func.sum(CodeBlob.size), 0))
+        .select_from(Snippet)
+        .join(CodeBlob, Snippet.code_hash == CodeBlob.hash)
+    )).one()
+    blobs = (await db.execute(
+        select(
+            func.count(),
+            func.coalesce(func.sum(CodeBlob.size), 0),
+            func.coalesce(func.sum(func.length(CodeBlob.data)), 0),
+        )
+    )).one()
+    logical_bytes, stored_bytes = int(snippets[1]), int(blobs[2])
+    return {
+        "snippets": snippets[0],
+        "blobs": blobs[0],
+        "logical_bytes": logical_bytes,
+        "deduplicated_bytes": int(blobs[1]),
+        "stored_bytes": stored_bytes,
+        "saved_bytes": logical_bytes - stored_bytes,
+        "savings_ratio": round(1 - stored_bytes / logical_bytes, 4) if logical_bytes else 0.0,
+    }
+
+
+# Удаление блобов, на которые больше не ссылается ни один сниппет
+async def prune_orphan_blobs(db: AsyncSession) -> int:
+    result = await db.execute(
+        delete(CodeBlob).where(~exists().where(Snippet.code_hash == CodeBlob.hash))
+    )
+    await db.commit()
+    return result.rowcount
+
+
+# Приём тела кода потоком: хэш, проверка UTF-8 и сжатие идут по мере чтения.
+# Размер тела в байтах ограничивает BodySizeLimitMiddleware, здесь - длина кода в символах,
+# та же, что у поля code в SnippetCreate
+async def receive_code_stream(chunks: AsyncIterator[bytes],
+                              max_length: int = settings.snippet_code_max_length) -> tuple[str, str, int, bytes]:
+    hasher = hashlib.sha256()
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    compressor = StreamCompressor()
+    packed: list[bytes] = []
+    size = length = 0
+    async for chunk in chunks:
+        size += len(chunk)
+        length += len(decoder.decode(chunk))
+        if length > max_length:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                detail=f"Snippet code exceeds {max_length} characters")
+        hasher.update(chunk)
+        packed.append(compressor.update(chunk))
+    decoder.decode(b"", final=True)
+    packed.append(compressor.finish())
+    return hasher.hexdigest(), compressor.codec, size, b"".join(packed)
@@ -0,0 +1,12 @@
+from .client import SnippetsClient
+from .concurrency import map_bounded
+from .errors import ApiError
+from .retry import RetryPolicy
+
+
+__all__ = [
+    "ApiError",
+    "RetryPolicy",
+    "SnippetsClient",
+    "map_bounded",
+]
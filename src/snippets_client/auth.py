@@ -0,0 +1,48 @@
+import asyncio
+import base64
+import json
+import time
+from typing import Awaitable, Callable, Optional
+
+
+# Срок жизни из поля exp JWT; подпись не проверяем - это делает сервер
+def token_expiry(token: str) -> Optional[float]:
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+# Кэш токена доступа: один запрос к /auth/token на все параллельные вызовы,
+# обновление заранее, за refresh_margin секунд до истечения
+class TokenCache:
+    def __init__(self, fetch: Callable[[], Awaitable[str]], refresh_margin: float = 30.0):
+        self._fetch = fetch
+        self._refresh_margin = refresh_margin
+        self._token: Optional[str] = None
+        self._expires_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def fresh(self) -> bool:
+        if self._token is None:
+            return False
+        return self._expires_at is None or time.time() < self._expires_at - self._refresh_margin
+
+    async def get(self) -> str:
+        if self.fresh:
+            return self._token
+        async with self._lock:
+            # Пока ждали блокировку, токен мог обновить другой вызов
+            if not self.fresh:
+                self._token = await self._fetch()
+                self._expires_at = token_expiry(self._token)
+            return self._token
+
+    # Сброс после 401: следующий get() получит новый токен, если этот ещё не заменён
+    def invalidate(self, token: str):
+        if self._token == token:
+            self._token = None
+            self._expires_at = None
@@ -0,0 +1,213 @@
+import asyncio
+import importlib.util
+import json
+import uuid
+from typing import AsyncIterable, AsyncIterator, Literal, Optional, Union
+
+import httpx
+
+from .auth import TokenCache
+from .concurrency import map_bounded
+from .errors import ApiError
+from .retry import RetryPolicy, parse_retry_after
+
+SnippetId = Union[str, uuid.UUID]
+
+
+def http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+async def _file_chunks(path: str, chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+    with open(path, "rb") as file:
+        while chunk := file.read(chunk_size):
+            yield chunk
+
+
+# Асинхронный клиент Code Snippet API.
+# Один экземпляр на сервис: внутри общий пул keep-alive соединений (HTTP/2, если установлен h2)
+# и кэш токена, поэтому /auth/token вызывается только при истечении токена или после 401.
+# transport позволяет работать с приложением в том же процессе: transport=httpx.ASGITransport(app=app)
+class SnippetsClient:
+    def __init__(
+            self,
+            base_url: str,
+            email: Optional[str] = None,
+            password: Optional[str] = None,
+            *,
+            transport: Optional[httpx.AsyncBaseTransport] = None,
+            http2: Optional[bool] = None,
+            max_connections: int = 100,
+            max_keepalive_connections: int = 20,
+            timeout: float = 30.0,
+            retry: RetryPolicy = RetryPolicy(),
+            concurrency: int = 16,
+    ):
+        self._email = email
+        self._password = password
+        self._retry = retry
+        self._concurrency = concurrency
+        self._tokens = TokenCache(self._fetch_token)
+        if http2 is None:
+            http2 = transport is None and http2_available()
+        self._http = httpx.AsyncClient(
+            base_url=base_url,
+            transport=transport,
+            http2=http2,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_keepalive_connections),
+        )
+
+    async def __aenter__(self) -> "SnippetsClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._http.aclose()
+
+    async def _fetch_token(self) -> str:
+        if self._email is None or self._password is None:
+            raise ApiError(401, "Client has no credentials")
+        response = await self._send("POST", "/auth/token",
+                                    data={"username": self._email, "password": self._password})
+        return response.json()["access_token"]
+
+    # Тело-генератор и открытый файл нельзя отправить дважды, такие запросы не повторяются
+    @staticmethod
+    def _replayable(kwargs: dict) -> bool:
+        return not isinstance(kwargs.get("content"), AsyncIterable) and "files" not in kwargs
+
+    # Отправка с повторами по RetryPolicy; со stream=True тело успешного ответа не читается,
+    # и вызывающий закрывает ответ сам
+    async def _send(self, method: str, url: str, headers: Optional[dict] = None, stream: bool = False,
+                    **kwargs) -> httpx.Response:
+        replayable = self._replayable(kwargs)
+        attempt = 0
+        while True:
+            request = self._http.build_request(method, url, headers=headers, **kwargs)
+            try:
+                response = await self._http.send(request, stream=stream)
+            except httpx.TransportError as ex:
+                if not replayable or attempt + 1 >= self._retry.attempts \
+                        or not self._retry.should_retry_error(method, ex):
+                    raise
+                await asyncio.sleep(self._retry.delay(attempt))
+                attempt += 1
+                continue
+            if response.is_success:
+                return response
+            await response.aread()
+            await response.aclose()
+            if replayable and attempt + 1 < self._retry.attempts and self._retry.should_retry(method, response):
+                await asyncio.sleep(self._retry.delay(attempt, parse_retry_after(response)))
+                attempt += 1
+                continue
+            raise self._error(response)
+
+    @staticmethod
+    def _error(response: httpx.Response) -> ApiError:
+        try:
+            message = response.json().get("message", response.text)
+        except (ValueError, AttributeError):
+            message = response.text
+        return ApiError(response.status_code, str(message), parse_retry_after(response))
+
+    # Запрос от имени пользователя; на 401 токен обновляется один раз
+    async def _request(self, method: str, url: str, headers: Optional[dict] = None, stream: bool = False,
+                       **kwargs) -> httpx.Response:
+        token = await self._tokens.get()
+        try:
+            return await self._send(method, url, headers={**(headers or {}), "Authorization": f"Bearer {token}"},
+                                    stream=stream, **kwargs)
+        except ApiError as ex:
+            if ex.status_code != 401 or not self._replayable(kwargs):
+                raise
+        self._tokens.invalidate(token)
+        token = await self._tokens.get()
+        return await self._send(method, url, headers={**(headers or {}), "Authorization": f"Bearer {token}"},
+                                stream=stream, **kwargs)
+
+    # /user
+    async def register(self, email: str, password: str, name: str) -> dict:
+        response = await self._send("POST", "/user/register",
+                                    json={"email": email, "password": password, "name": name})
+        return response.json()
+
+    async def me(self) -> dict:
+        return (await self._request("GET", "/user/me")).json()
+
+    # /snippets
+    async def create_snippet(self, title: str, code: str, is_public: bool = True) -> dict:
+        response = await self._request("POST", "/snippets/create_snippet",
+                                       json={"title": title, "code": code, "is_public": is_public})
+        return response.json()
+
+    async def get_snippet(self, snippet_uuid: SnippetId, response_format: Literal["json", "html"] = "json",
+                          style: Optional[str] = None) -> dict:
+        params = {"format": response_format}
+        if style is not None:
+            params["style"] = style
+        response = await self._send("GET", f"/snippets/get_snippet/{snippet_uuid}", params=params)
+        return response.json()
+
+    # Пачка сниппетов по UUID: запросы идут параллельно (не больше concurrency одновременно)
+    # и мультиплексируются в одно соединение HTTP/2 или расходятся по keep-alive пулу
+    async def get_snippets(self, snippet_uuids: list[SnippetId], concurrency: Optional[int] = None,
+                           return_exceptions: bool = False) -> list:
+        return await map_bounded(self.get_snippet, snippet_uuids, concurrency or self._concurrency,
+                                 return_exceptions=return_exceptions)
+
+    async def all_snippets(self) -> list[dict]:
+        return (await self._request("GET", "/snippets/all_snippets")).json()
+
+    async def update_snippet(self, snippet_uuid: SnippetId, title: str, code: str, is_public: bool = True) -> dict:
+        response = await self._request("PUT", f"/snippets/update_snippet/{snippet_uuid}",
+                                       json={"title": title, "code": code, "is_public": is_public})
+        return response.json()
+
+    # Код сырым телом; bytes можно повторить, асинхронный поток отправляется один раз
+    async def upload_code(self, snippet_uuid: SnippetId, code: Union[str, bytes, AsyncIterable[bytes]]) -> dict:
+        if isinstance(code, str):
+            code = code.encode("utf-8")
+        response = await self._request("PUT", f"/snippets/upload_code/{snippet_uuid}", content=code,
+                                       headers={"Content-Type": "text/plain; charset=utf-8"})
+        return response.json()
+
+    async def delete_snippet(self, snippet_uuid: SnippetId) -> dict:
+        return (await self._request("DELETE", f"/snippets/delete_snippet/{snippet_uuid}")).json()
+
+    async def revisions(self, snippet_uuid: SnippetId) -> list[dict]:
+        return (await self._request("GET", f"/snippets/{snippet_uuid}/revisions")).json()
+
+    async def revision(self, snippet_uuid: SnippetId, number: int) -> dict:
+        return (await self._request("GET", f"/snippets/{snippet_uuid}/revisions/{number}")).json()
+
+    # Файл отправляется сырым телом по частям, сервер разбирает его по мере получения
+    async def import_file(self, path: str, import_format: Optional[Literal["ndjson", "csv"]] = None) -> dict:
+        import_format = import_format or ("csv" if path.lower().endswith(".csv") else "ndjson")
+        content_type = "text/csv" if import_format == "csv" else "application/x-ndjson"
+        response = await self._request("POST", "/snippets/import", params={"format": import_format},
+                                       content=_file_chunks(path), headers={"Content-Type": content_type})
+        return response.json()
+
+    # Потоковая выгрузка NDJSON по одной записи; cursor из последней записи продолжает прерванную выгрузку
+    async def export(self, scope: Literal["mine", "public"] = "mine",
+                     cursor: Optional[str] = None) -> AsyncIterator[dict]:
+        params = {"format": "ndjson", "scope": scope}
+        if cursor:
+            params["cursor"] = cursor
+        # Обновление токена и повторы - как у остальных запросов, до начала чтения тела
+        response = await self._request("GET", "/snippets/export", params=params, stream=True)
+        try:
+            async for line in response.aiter_lines():
+                if line:
+                    yield json.loads(line)
+        finally:
+            await response.aclose()
+
+    # /health
+    async def ready(self) -> dict:
+        return (await self._send("GET", "/health/ready")).json()
@@ -0,0 +1,33 @@
+import asyncio
+from typing import Awaitable, Callable, Iterable, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+# Применяет func ко всем элементам силами limit воркеров; порядок результатов сохраняется.
+# Воркеры берут элементы из общего итератора, поэтому задач всегда не больше limit.
+# При return_exceptions=True ошибки возвращаются на месте результата, иначе первая отменяет остальные
+async def map_bounded(func: Callable[[T], Awaitable[R]], items: Iterable[T], limit: int,
+                      return_exceptions: bool = False) -> list:
+    items = list(items)
+    results: list = [None] * len(items)
+    pending = iter(enumerate(items))
+
+    async def worker():
+        for index, item in pending:
+            try:
+                results[index] = await func(item)
+            except Exception as ex:
+                if not return_exceptions:
+                    raise
+                results[index] = ex
+
+    try:
+        async with asyncio.TaskGroup() as group:
+            for _ in range(min(limit, len(items))):
+                group.create_task(worker())
+    except ExceptionGroup as errors:
+        # Наружу - исходная ошибка (например ApiError), а не группа
+        raise errors.exceptions[0]
+    return results
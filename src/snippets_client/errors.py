@@ -0,0 +1,10 @@
+from typing import Optional
+
+
+# Ошибка API: статус, сообщение из {"message": ...} и подсказка Retry-After, если сервер её прислал
+class ApiError(Exception):
+    def __init__(self, status_code: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(f"{status_code}: {message}")
+        self.status_code = status_code
+        self.message = message
+        self.retry_after = retry_after
@@ -0,0 +1,41 @@
+import random
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+def parse_retry_after(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return None
+
+
+# Повтор с экспоненциальной задержкой и полным джиттером; Retry-After сервера имеет приоритет
+@dataclass(frozen=True)
+class RetryPolicy:
+    attempts: int = 4
+    base_delay: float = 0.2
+    max_delay: float = 10.0
+    retry_statuses: frozenset[int] = frozenset({429, 502, 503, 504})
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    # Ответ означает, что запрос дошёл до сервера и мог быть выполнен, поэтому по статусу
+    # повторяются только идемпотентные методы - даже 503 с Retry-After не гарантирует, что POST не обработан
+    def should_retry(self, method: str, response: httpx.Response) -> bool:
+        return method in IDEMPOTENT_METHODS and response.status_code in self.retry_statuses
+
+    def should_retry_error(self, method: str, error: httpx.TransportError) -> bool:
+        # Соединение не установлено - запрос точно не отправлен, его можно повторить любым методом
+        return method in IDEMPOTENT_METHODS or isinstance(
+            error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import Depends, HTTPException
+from sqlalchemy.exc import TimeoutError as SQLAlchemyTimeoutError
+
+import api.v1.auth as auth_routes
+from auth.auth import create_access_token, get_current_user, oauth2_bearer
+from core import admission
+from core.compression import compress
+from db.db import get_async_session
+from main import app
+from models import User
+from services import export
+from snippets_client import RetryPolicy, SnippetsClient
+
+EMAIL = "tester@example.com"
+PASSWORD = "secret"
+
+
+# Приложение без базы: пользователи и строки выгрузки подменяются, а middleware, обработчики ошибок
+# и выдача JWT работают как обычно. fail_next - сколько ближайших авторизаций ответят 503 (пул исчерпан)
+class FakeBackend:
+    def __init__(self):
+        self.issued: list[str] = []
+        self.revoked: set[str] = set()
+        self.fail_next = 0
+        self.auth_calls = 0
+        self.rows: list[SimpleNamespace] = []
+
+    @staticmethod
+    def user() -> User:
+        return User(id=1, email=EMAIL, name="tester")
+
+    async def authenticate_user(self, login_data, db):
+        return self.user() if (login_data.email, login_data.password) == (EMAIL, PASSWORD) else False
+
+    def create_access_token(self, data: dict) -> str:
+        # Номер в claims, чтобы токены, выданные в одну секунду, различались
+        token = create_access_token({**data, "n": len(self.issued)})
+        self.issued.append(token)
+        return token
+
+    async def get_current_user(self, token: str = Depends(oauth2_bearer)) -> User:
+        self.auth_calls += 1
+        if self.fail_next:
+            self.fail_next -= 1
+            raise SQLAlchemyTimeoutError("QueuePool limit reached")
+        if token not in self.issued or token in self.revoked:
+            raise HTTPException(status_code=401, detail="Could not validate credentials")
+        return self.user()
+
+    async def iter_export_rows(self, author_id, cursor):
+        for row in self.rows:
+            if cursor is None or row.uuid > cursor:
+                yield row
+
+    def add_row(self, snippet_uuid, title: str, code: str):
+        codec, data = compress(code.encode("utf-8"))
+        self.rows.append(SimpleNamespace(uuid=snippet_uuid, title=title, is_public=True, author_name="tester",
+                                         codec=codec, data=data))
+
+
+async def no_session():
+    yield None
+
+
+@pytest.fixture
+def backend(monkeypatch, tmp_path):
+    state = FakeBackend()
+    monkeypatch.setattr(auth_routes, "authenticate_user", state.authenticate_user)
+    monkeypatch.setattr(auth_routes, "create_access_token", state.create_access_token)
+    monkeypatch.setattr(export, "iter_export_rows", state.iter_export_rows)
+    # Лимиты запросов в отдельном файле, чтобы тесты не делили их между собой
+    monkeypatch.setattr(admission.admission, "buckets",
+                        admission.TokenBucketStore(str(tmp_path / "ratelimit.sqlite3")))
+    app.dependency_overrides[get_current_user] = state.get_current_user
+    app.dependency_overrides[get_async_session] = no_session
+    yield state
+    app.dependency_overrides.clear()
+
+
+@pytest_asyncio.fixture
+async def client(backend):
+    async with SnippetsClient("http://testserver", EMAIL, PASSWORD,
+                              transport=httpx.ASGITransport(app=app),
+                              retry=RetryPolicy(base_delay=0, max_delay=0)) as snippets_client:
+        yield snippets_client
@@ -0,0 +1,80 @@
+import uuid
+
+import httpx
+import pytest
+
+from main import app
+from snippets_client import ApiError, SnippetsClient
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_token_is_cached_between_requests(client, backend):
+    await client.me()
+    await client.me()
+    assert len(backend.issued) == 1
+
+
+async def test_refreshes_token_once_on_401(client, backend):
+    await client.me()
+    backend.revoked.add(backend.issued[0])
+
+    profile = await client.me()
+
+    assert profile["email"] == "tester@example.com"
+    assert len(backend.issued) == 2
+
+
+async def test_wrong_credentials_raise_401(backend):
+    async with SnippetsClient("http://testserver", "tester@example.com", "wrong",
+                              transport=httpx.ASGITransport(app=app)) as client:
+        with pytest.raises(ApiError) as error:
+            await client.me()
+    assert error.value.status_code == 401
+
+
+async def test_idempotent_request_is_retried_on_503(client, backend):
+    await client.me()
+    backend.fail_next = 2
+
+    await client.me()
+
+    assert backend.auth_calls == 4
+
+
+async def test_post_is_not_retried_on_503_with_retry_after(client, backend):
+    await client.me()
+    backend.fail_next = 1
+    calls = backend.auth_calls
+
+    with pytest.raises(ApiError) as error:
+        await client.create_snippet("title", "print(1)")
+
+    assert error.value.status_code == 503
+    assert error.value.retry_after == 1.0
+    assert backend.auth_calls == calls + 1
+
+
+async def test_export_streams_records(client, backend):
+    uuids = sorted(uuid.uuid4() for _ in range(3))
+    for number, snippet_uuid in enumerate(uuids):
+        backend.add_row(snippet_uuid, f"snippet {number}", f"print({number})\n")
+
+    records = [record async for record in client.export()]
+
+    assert [record["uuid"] for record in records] == [str(snippet_uuid) for snippet_uuid in uuids]
+    assert records[1]["code"] == "print(1)\n"
+    resumed = [record async for record in client.export(cursor=records[0]["cursor"])]
+    assert [record["uuid"] for record in resumed] == [str(snippet_uuid) for snippet_uuid in uuids[1:]]
+
+
+async def test_export_refreshes_token_and_retries(client, backend):
+    backend.add_row(uuid.uuid4(), "snippet", "code")
+    await client.me()
+    backend.revoked.add(backend.issued[0])
+    backend.fail_next = 1
+
+    records = [record async for record in client.export()]
+
+    assert len(records) == 1
+    assert len(backend.issued) == 2
@@ -0,0 +1,31 @@
+import uuid
+
+import httpx
+import pytest
+
+from main import app
+from services.export import snippet_filename
+
+SNIPPET_UUID = uuid.UUID(int=1)
+
+
+@pytest.mark.parametrize("title, filename", [
+    ("main.py", f"main_{SNIPPET_UUID}.py"),
+    ("hello.c++", f"hello_{SNIPPET_UUID}.c++"),
+    ("my script.sh", f"my_script_{SNIPPET_UUID}.sh"),
+    ("Makefile", f"Makefile_{SNIPPET_UUID}.txt"),
+    (".bashrc", f"bashrc_{SNIPPET_UUID}.txt"),
+    (None, f"snippet_{SNIPPET_UUID}.txt"),
+])
+def test_archive_filename_keeps_title_extension(title, filename):
+    assert snippet_filename(title, SNIPPET_UUID) == filename
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("export_format", ["tar", "zip"])
+async def test_archive_export_rejects_cursor(client, backend, export_format):
+    await client.me()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver") as http:
+        response = await http.get("/snippets/export", params={"format": export_format, "cursor": "AAAA"},
+                                  headers={"Authorization": f"Bearer {backend.issued[0]}"})
+    assert response.status_code == 400
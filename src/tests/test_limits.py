@@ -0,0 +1,23 @@
+import json
+
+import pytest
+
+from core.config import settings
+from core.limits import body_limit_for
+
+
+@pytest.mark.parametrize("char", ["a", "ж", "€", "😀", "\x00"])
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+@pytest.mark.parametrize("path", ["/snippets/create_snippet", "/snippets/update_snippet/6a1c"])
+def test_longest_valid_snippet_fits_json_route_limit(char, ensure_ascii, path):
+    body = json.dumps({
+        "title": char * settings.snippet_title_max_length,
+        "code": char * settings.snippet_code_max_length,
+        "is_public": False,
+    }, ensure_ascii=ensure_ascii).encode("utf-8")
+    assert len(body) <= body_limit_for(path)
+
+
+def test_longest_valid_upload_fits_upload_limit():
+    body = ("😀" * settings.snippet_code_max_length).encode("utf-8")
+    assert len(body) <= body_limit_for("/snippets/upload_code/6a1c")